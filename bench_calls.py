@@ -0,0 +1,187 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Load generator for voip_server.py. Starts the server, then runs batches of
+# paired headless callers against it and reports per batch:
+#   python bench_calls.py --calls 1,10,50 --duration 10 --codec ulaw
+# --per-client multiplexes that many calls on each client's connection
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import voip_audio
+import voip_stats
+from voip import ACTIVE, Client
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def start_server(port, transport):
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "voip_server.py"),
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--transport", transport,
+        ]
+    )
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if transport == "udp":
+            time.sleep(0.5)  # Nothing to connect to, give the server time to bind
+            return server
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.2).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError(f"voip_server.py did not start on port {port}")
+
+
+def cpu_seconds(pid):
+    # utime and stime, fields 14 and 15 of /proc/<pid>/stat
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def rss_kb(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def make_client(args):
+    client = Client()
+    client.dst_address = "127.0.0.1"
+    client.dst_port = args.port
+    client.framing = not args.raw
+    client.transport = args.transport
+    client.codec = args.codec
+    client.packet_ms = args.packet_ms
+    return client
+
+
+def run_batch(args, server, calls):
+    # Both ends of call n are placed by clients 2 * (n // per_client) and the one after
+    clients = [make_client(args) for _ in range(2 * -(-calls // args.per_client))]
+    rss_before = rss_kb(server.pid)
+    handles = []
+    for call in range(calls):
+        for side in range(2):
+            client = clients[2 * (call // args.per_client) + side]
+            handles.append(
+                client.start_call(
+                    f"bench-{calls}-{call}", voip_audio.SineSource(), voip_audio.NullSink()
+                )
+            )
+    failed = sum(1 for call in handles if call.state != ACTIVE)
+    cpu_before = cpu_seconds(server.pid)
+    started = time.monotonic()
+    time.sleep(args.duration)
+    elapsed = time.monotonic() - started
+    cpu = cpu_seconds(server.pid) - cpu_before
+    rss = rss_kb(server.pid)
+    snapshots = [call.stats.snapshot() for call in handles]
+    mouth_to_ear = voip_stats.LatencyHistogram()
+    for call in handles:
+        mouth_to_ear.merge(call.stats.mouth_to_ear)
+    for client in clients:
+        client.end_call()
+    # Only the call that opened a connection records its setup
+    connect_ms = [s["connect_ms"] for s in snapshots if s["connect_ms"] is not None]
+    bytes_received = sum(s["bytes_received"] for s in snapshots)
+    return {
+        "calls": calls,
+        "connections": len(clients),
+        "failed": failed,
+        "connect_p50_ms": percentile(connect_ms, 0.5),
+        "connect_p99_ms": percentile(connect_ms, 0.99),
+        "throughput_kbps": bytes_received * 8 / elapsed / 1000,
+        "frames_received": sum(s["frames_received"] for s in snapshots),
+        "underruns": sum((s["jitter"] or {}).get("underruns", 0) for s in snapshots),
+        "m2e_p50_ms": ms(mouth_to_ear.percentile(0.5)),
+        "m2e_p95_ms": ms(mouth_to_ear.percentile(0.95)),
+        "m2e_p99_ms": ms(mouth_to_ear.percentile(0.99)),
+        "server_cpu_pct": cpu / elapsed * 100,
+        "server_rss_kb_per_call": (rss - rss_before) / calls,
+    }
+
+
+def ms(us):
+    return None if us is None else us / 1000
+
+
+def report(result):
+    print(
+        " ".join(
+            f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in result.items()
+        ),
+        flush=True,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kivy VoIP call load benchmark")
+    parser.add_argument("--calls", default="1,10,50", help="comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10, help="secs per level")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--transport", choices=("tcp", "udp"), default="tcp")
+    parser.add_argument("--codec", choices=("pcm", "ulaw", "adpcm"), default="pcm")
+    parser.add_argument("--packet-ms", type=int, choices=(10, 20, 40, 60), default=20)
+    parser.add_argument("--raw", action="store_true", help="unframed PCM like the original client")
+    parser.add_argument("--per-client", type=int, default=1, help="calls sharing each connection")
+    args = parser.parse_args(argv)
+    if args.raw and (args.transport == "udp" or args.codec != "pcm" or args.per_client > 1):
+        parser.error("--raw only works with --transport tcp, --codec pcm and --per-client 1")
+    if not 1 <= args.per_client <= 256:
+        parser.error("--per-client must be between 1 and 256")
+    server = start_server(args.port, args.transport)
+    try:
+        for calls in args.calls.split(","):
+            report(run_batch(args, server, int(calls)))
+            time.sleep(0.5)  # Let the server drop the previous batch
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Packet loss concealment and FEC under synthetic loss:
+#   python bench_loss.py --loss 0.05,0.1,0.2 --burst 2 --seconds 20
+# Frames of a voiced test signal pass through the same steps as a call,
+# FecEncoder, split_redundant, JitterBuffer and Concealer, with no network.
+# Loss follows a two state Gilbert model: --loss is the share of frames
+# lost and --burst the mean length of a run of lost frames. snr_db compares
+# what would be played with the signal that was sent. Higher is better.
+
+import argparse
+import math
+import random
+
+import numpy as np
+
+import voip_jitter
+import voip_plc
+import voip_protocol
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+SCHEMES = (
+    # name, plc mode, fec copies
+    ("silence", "", 0),
+    ("fade", "fade", 0),
+    ("pitch", "pitch", 0),
+    ("fec1+pitch", "pitch", 1),
+    ("fec2+pitch", "pitch", 2),
+)
+
+
+def voiced_signal(seconds, seed=1):
+    # Harmonics of a gliding 100-250 Hz fundamental, with syllable-like loudness
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 175 + 75 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 9))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2
+    signal = voice * envelope * 6000 + rng.standard_normal(len(t)) * 100
+    return np.clip(signal, -32768, 32767).astype(voip_plc.PCM)
+
+
+def gilbert_losses(frames, loss, burst, seed=2):
+    # P(lost -> received) is 1 / burst, P(received -> lost) keeps the average at loss
+    rng = random.Random(seed)
+    if loss <= 0:
+        return [False] * frames
+    recover = 1 / burst
+    fail = loss * recover / (1 - loss)
+    lost = False
+    pattern = []
+    for _ in range(frames):
+        lost = rng.random() < (1 - recover if lost else fail)
+        pattern.append(lost)
+    return pattern
+
+
+def run_scheme(signal, pattern, plc, fec):
+    clock = [0.0]
+    jitter = voip_jitter.JitterBuffer(
+        SAMPLE_RATE, frame_ms=FRAME_MS, min_delay_ms=2 * FRAME_MS, clock=lambda: clock[0]
+    )
+    concealer = voip_plc.Concealer(SAMPLE_RATE, plc) if plc else None
+    encoder = voip_plc.FecEncoder(fec) if fec else None
+    frames = signal.reshape(-1, FRAME_SAMPLES)
+    played = []  # (sequence the output stands in for, PCM)
+    last_sequence = None
+    concealed = recovered = 0
+    for sequence, samples in enumerate(frames):
+        clock[0] = sequence * FRAME_MS / 1000
+        timestamp = sequence * FRAME_MS
+        pcm = samples.tobytes()
+        if encoder is not None:
+            data = encoder.encode(voip_protocol.PCM16, pcm, pcm, sequence, timestamp)
+        else:
+            data = voip_protocol.encode_frame(voip_protocol.PCM16, pcm, sequence, timestamp)
+        if not pattern[sequence]:
+            frame = voip_protocol.decode_frame(data)
+            if frame.type == voip_protocol.REDUNDANT:
+                frame, copies = voip_protocol.split_redundant(frame)
+                for copy in copies:
+                    audio = voip_plc.voip_codec.decode(copy.type, copy.payload)
+                    recovered += jitter.recover(audio, copy.sequence, copy.timestamp)
+            jitter.put(bytes(frame.payload), frame.sequence, frame.timestamp)
+        payload = jitter.get()
+        if payload is not None:
+            last_sequence = jitter.played_timestamp // FRAME_MS
+            if concealer is not None:
+                payload = concealer.played(payload)
+        elif last_sequence is None:
+            continue  # Still buffering before playback starts
+        else:
+            last_sequence += 1
+            if jitter.gap and concealer is not None:
+                payload = concealer.conceal(2 * FRAME_SAMPLES)
+                concealed += payload is not None
+        played.append((last_sequence, payload or bytes(2 * FRAME_SAMPLES)))
+    played = [(s, pcm) for s, pcm in played if s < len(frames)]
+    output = np.frombuffer(b"".join(pcm for _, pcm in played), voip_plc.PCM).astype(np.float64)
+    reference = frames[[s for s, _ in played]].ravel().astype(np.float64)
+    error = output - reference
+    snr = 10 * math.log10(np.sum(reference ** 2) / max(np.sum(error ** 2), 1e-9))
+    return {"snr_db": snr, "concealed": concealed, "recovered": recovered, "lost": sum(pattern)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kivy VoIP packet loss benchmark")
+    parser.add_argument("--loss", default="0.02,0.05,0.1,0.2", help="comma separated loss rates")
+    parser.add_argument("--burst", type=float, default=1.5, help="mean frames per loss run")
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args(argv)
+    signal = voiced_signal(args.seconds)
+    signal = signal[:len(signal) - len(signal) % FRAME_SAMPLES]
+    for loss in args.loss.split(","):
+        pattern = gilbert_losses(len(signal) // FRAME_SAMPLES, float(loss), args.burst)
+        for name, plc, fec in SCHEMES:
+            result = run_scheme(signal, pattern, plc, fec)
+            print(
+                f"loss={float(loss):.2f} burst={args.burst} scheme={name} "
+                + " ".join(
+                    f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                    for key, value in result.items()
+                ),
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
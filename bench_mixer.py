@@ -0,0 +1,93 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Conference mixing cost for rooms of different sizes:
+#   python bench_mixer.py --sizes 2,4,8,16,32,64 --ticks 2000
+# "mix" times voip_mixer.Mixer alone. "tick" times ConferenceRoom.tick, which
+# also takes audio from each participant's queue and hands out the mixes.
+# budget is the share of one TICK_MS interval a room uses on one core.
+
+import argparse
+import os
+import time
+
+import voip_server
+
+
+class Participant:
+    # Stands in for an Endpoint. Its queue is refilled before every tick
+    rate = voip_server.SAMPLE_RATE
+
+    def send_raw(self, data):
+        pass
+
+
+def bench_room(size, ticks):
+    room = voip_server.ConferenceRoom("bench", max(size, 2))
+    participants = [Participant() for _ in range(size)]
+    for participant in participants:
+        room.add(participant)
+    audio = [os.urandom(room.frame_bytes) for _ in participants]
+    mix_seconds = tick_seconds = 0.0
+    for _ in range(ticks):
+        for participant, pcm in zip(participants, audio):
+            room.pcm_received(participant, pcm)
+        started = time.perf_counter()
+        room.tick()
+        tick_seconds += time.perf_counter() - started
+    for row in range(size):
+        room.mixer.load(row, audio[row])
+    for _ in range(ticks):
+        started = time.perf_counter()
+        room.mixer.mix(size)
+        mix_seconds += time.perf_counter() - started
+    tick_us = tick_seconds / ticks * 1000000
+    return {
+        "participants": size,
+        "mix_us": mix_seconds / ticks * 1000000,
+        "tick_us": tick_us,
+        "tick_us_per_participant": tick_us / size,
+        "budget_pct": tick_us / (voip_server.TICK_MS * 10),
+        "mixed_streams_per_s": size * ticks / tick_seconds,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kivy VoIP conference mixing benchmark")
+    parser.add_argument("--sizes", default="2,4,8,16,32,64", help="comma separated room sizes")
+    parser.add_argument("--ticks", type=int, default=2000)
+    args = parser.parse_args(argv)
+    for size in args.sizes.split(","):
+        result = bench_room(int(size), args.ticks)
+        print(
+            " ".join(
+                f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in result.items()
+            ),
+            flush=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
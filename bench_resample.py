@@ -0,0 +1,83 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Per frame cost of voip_resample.FormatConverter:
+#   python bench_resample.py --frames 2000 --frame-ms 20
+# Each case feeds one stream a frame at a time, as a client or the server
+# would. streams_per_core is how many such streams fit in real time on one
+# core, ignoring everything else a call does.
+
+import argparse
+import time
+
+import numpy as np
+
+import voip_resample
+
+CASES = (
+    # in_rate, out_rate, in_format, out_format, in_channels, out_channels
+    (48000, 16000, "float32", "int16", 1, 1),  # iOS capture to the wire
+    (16000, 48000, "int16", "float32", 1, 1),  # Wire to iOS playback
+    (44100, 16000, "int16", "int16", 2, 1),  # CD quality WAV file
+    (16000, 8000, "int16", "int16", 1, 1),
+    (16000, 16000, "float32", "int16", 1, 1),  # Format only
+)
+
+
+def bench_case(case, frames, frame_ms):
+    in_rate, out_rate, in_format, out_format, in_channels, out_channels = case
+    converter = voip_resample.FormatConverter(*case)
+    samples = in_rate * frame_ms // 1000
+    tone = 0.3 * np.sin(2 * np.pi * 440 * np.arange(samples * in_channels) / in_rate)
+    frame = voip_resample.encode(tone.reshape(-1, in_channels), in_format)
+    started = time.perf_counter()
+    for _ in range(frames):
+        converter.convert(frame)
+    frame_us = (time.perf_counter() - started) / frames * 1000000
+    return {
+        "case": f"{in_rate}/{in_format}/{in_channels}->{out_rate}/{out_format}/{out_channels}",
+        "taps": converter.resampler.taps,
+        "frame_us": frame_us,
+        "streams_per_core": frame_ms * 1000 / frame_us,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kivy VoIP resampling benchmark")
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--frame-ms", type=int, default=20)
+    args = parser.parse_args(argv)
+    for case in CASES:
+        result = bench_case(case, args.frames, args.frame_ms)
+        print(
+            " ".join(
+                f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in result.items()
+            ),
+            flush=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
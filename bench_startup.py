@@ -0,0 +1,82 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Startup cost of the voip module. Each run is a fresh interpreter, so nothing
+# is cached between runs:
+#   python bench_startup.py --runs 20
+# import and Client() are what the app pays before its first frame. prewarm is
+# the work now deferred to the first call or a background Client.prewarm, which
+# used to run at import (eager = import + client + prewarm)
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import time
+started = time.perf_counter()
+import voip
+imported = time.perf_counter()
+client = voip.Client()
+created = time.perf_counter()
+client.prewarm(background=False)
+warmed = time.perf_counter()
+print(imported - started, created - imported, warmed - created)
+"""
+
+
+def run_probe():
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return [float(value) * 1000 for value in output.split()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kivy VoIP startup benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args(argv)
+    runs = [run_probe() for _ in range(args.runs)]
+    columns = {
+        "import": [run[0] for run in runs],
+        "client": [run[1] for run in runs],
+        "prewarm": [run[2] for run in runs],
+        "startup": [run[0] + run[1] for run in runs],
+        "eager": [sum(run) for run in runs],
+    }
+    for name, values in columns.items():
+        print(
+            f"{name:8} median={statistics.median(values):8.2f} ms"
+            f" min={min(values):8.2f} ms max={max(values):8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Relay capacity against the number of worker processes:
+#   python bench_workers.py --workers 1,2,4 --calls 200 --duration 10
+# Callers are lightweight framed TCP connections sending 20 ms PCM frames,
+# paired by client_id so that most calls land on workers that have to hand
+# one side to the owner. For each worker count this reports the CPU used by
+# the busiest worker and capacity_calls, the calls the workers could carry
+# before that worker saturates a core. Balanced workers make capacity_calls
+# grow linearly. On a machine with fewer cores than workers plus this load
+# generator, the estimate is the figure to read, not the throughput.
+
+import argparse
+import asyncio
+import os
+
+import voip_protocol
+import voip_server
+from bench_calls import cpu_seconds, report
+
+FRAME_MS = 20
+FRAME_BYTES = voip_server.SAMPLE_RATE * voip_server.SAMPLE_WIDTH * FRAME_MS // 1000
+
+
+class Caller(asyncio.Protocol):
+    def __init__(self):
+        self.transport = None
+        self.bytes_received = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.bytes_received += len(data)
+
+
+async def run_calls(port, calls, duration, pids):
+    loop = asyncio.get_running_loop()
+    callers = []
+    for call in range(calls):
+        for _ in range(2):
+            _, caller = await loop.create_connection(Caller, "127.0.0.1", port)
+            caller.transport.write(
+                voip_protocol.encode_frame(
+                    voip_protocol.HELLO, f"bench-{call}".encode(), 0,
+                    flags=voip_protocol.codec_mask(()),
+                )
+            )
+            callers.append(caller)
+    await asyncio.sleep(0.5)  # Handoffs and pairing
+    payload = bytes(FRAME_BYTES)
+    cpu_before = [cpu_seconds(pid) for pid in pids]
+    started = next_tick = loop.time()
+    sequence = 0
+    while loop.time() - started < duration:
+        frame = voip_protocol.encode_frame(voip_protocol.PCM16, payload, sequence)
+        for caller in callers:
+            caller.transport.write(frame)
+        sequence += 1
+        next_tick += FRAME_MS / 1000
+        await asyncio.sleep(max(next_tick - loop.time(), 0))
+    elapsed = loop.time() - started
+    await asyncio.sleep(0.2)  # Let the last frames arrive
+    cpu = [cpu_seconds(pid) - before for pid, before in zip(pids, cpu_before)]
+    for caller in callers:
+        caller.transport.close()
+    silent = sum(1 for caller in callers if caller.bytes_received == 0)
+    frames_received = sum(caller.bytes_received for caller in callers) // (
+        voip_protocol.HEADER_SIZE + FRAME_BYTES
+    )
+    return elapsed, cpu, silent, frames_received
+
+
+def run_workers(args, workers):
+    pool = voip_server.Workers(workers, host="127.0.0.1", port=0)
+    pool.start()
+    try:
+        elapsed, cpu, silent, frames_received = asyncio.run(
+            run_calls(pool.port, args.calls, args.duration, pool.pids)
+        )
+    finally:
+        pool.stop()
+    busiest = max(cpu) / elapsed
+    return {
+        "workers": workers,
+        "calls": args.calls,
+        "silent_callers": silent,
+        "frames_per_s": frames_received / elapsed,
+        "busiest_worker_cpu_pct": busiest * 100,
+        "total_cpu_pct": sum(cpu) / elapsed * 100,
+        "capacity_calls": args.calls / busiest if busiest else float("inf"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kivy VoIP relay worker scaling benchmark")
+    parser.add_argument("--workers", default="1,2,4", help="comma separated worker counts")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10, help="secs per worker count")
+    args = parser.parse_args(argv)
+    print(f"cores={os.cpu_count()}", flush=True)
+    for workers in args.workers.split(","):
+        report(run_workers(args, int(workers)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,27 @@
 from kivy.app import App
 from kivy.uix.button import Button
 from kivy.uix.boxlayout import BoxLayout
-import threading
-from voip import Client  # Import from voip.py module
+from kivy.clock import Clock
+from voip import Client, ENDED, FAILED  # Import from voip.py module
 
 class VOIPClientApp(App):
-    # Initialize a client
-    client = Client()
-
-    # Configure connection from client to VOIP server
-    client.dst_address = "192.168.1.12"  # Set to your server's IP address. Use root domain if using SSL (loopback by default)
-    client.dst_port = 8080  # Set to your server's assigned port (port 8080 by default)
-    client.ssl = False  # Determines if SSL/TLS will be used (False by default)
-    client.tls_version = ""  # Defaults to auto selection if empty string. TLSv1.3 and TLSv1.2 are options.
-    client.client_id = "user@kivy.org"  # Supports identifying/authenticating connection (optional)
-    client.debug = True  # Enables debug statements for troubleshooting purposes with adb
-    client.timeout = 3  # Sets wait time to connect to server (5 seconds is default)
-    
+    def build_client(self):
+        # Initialize a client. Created in build so the app window opens first
+        client = Client()
+
+        # Configure connection from client to VOIP server
+        client.dst_address = "192.168.1.12"  # Set to your server's IP address. Use root domain if using SSL (loopback by default)
+        client.dst_port = 8080  # Set to your server's assigned port (port 8080 by default)
+        client.ssl = False  # Determines if SSL/TLS will be used (False by default)
+        client.tls_version = ""  # Defaults to auto selection if empty string. TLSv1.3 and TLSv1.2 are options.
+        client.client_id = "user@kivy.org"  # Supports identifying/authenticating connection (optional)
+        client.debug = True  # Enables debug statements for troubleshooting purposes with adb
+        client.timeout = 3  # Sets wait time to connect to server (5 seconds is default)
+        return client
+
     def build(self):
+        self.client = self.build_client()
+        self.call = None  # The Call returned by start_call
         # Create a call and end call button to alternate between to allow client control over VOIP call
         self.layout = BoxLayout(orientation='vertical')
         self.call_button = Button(text="Call")
@@ -26,31 +30,33 @@ class VOIPClientApp(App):
         self.end_call_button.bind(on_press=self.end_call)
         self.layout.add_widget(self.call_button)
         self.layout.add_widget(self.end_call_button)
+        self.client.subscribe(self.on_call_state)  # Notified when the state of any call changes
         return self.layout
-    
-    def auto_end_call(self):  # Automate ending call, including if connection closes externally
-	# If client is connected and has permission, call is active
-	# Else, display an error dialog or message indicating which condition is not met
-        if self.client.connected and self.client.hasPermission:
-            while self.client.active_call:  # Loop that runs until call ends
-                pass
-        if not self.end_call_button.disabled:
-            instance = VOIPClientApp()
-            self.end_call(instance)
+
+    def on_start(self):
+        self.client.prewarm()  # Loads audio bindings in the background while the UI is idle
+
+    def on_call_state(self, call, state):  # Automate ending call, including if connection closes externally
+	# Runs on the client's threads, so the buttons are updated on the main thread
+	# A FAILED state means permission was missing, the server was unreachable or the stream broke
+        if state in (ENDED, FAILED):
+            Clock.schedule_once(self.reset_buttons)
+
+    def reset_buttons(self, dt):
+        self.end_call_button.disabled = True
+        self.call_button.disabled = False
 
     def start_call(self, instance):
 	# Disable call button after call button is pressed
         self.call_button.disabled = True
         self.end_call_button.disabled = False
-        self.client.start_call()  # Initiate the VOIP call
-        self.track_call_thread = threading.Thread(target=self.auto_end_call, daemon=True)
-        self.track_call_thread.start()
+        self.call = self.client.start_call()  # Initiate the VOIP call. Returns a handle to it
 
     def end_call(self, instance):
         # Disable end call button after end call button is pressed
         self.end_call_button.disabled = True
         self.call_button.disabled = False
-        self.client.end_call()  # End the VOIP call
+        self.call.end()  # End the VOIP call
         
 if __name__ == "__main__":
     VOIPClientApp().run()
@@ -0,0 +1,93 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# JitterBuffer driven by synthetic arrival traces on a fake clock
+
+import random
+
+import voip_jitter
+
+FRAME_MS = 20
+PAYLOAD = bytes(640)  # 20 ms of 16 kHz PCM16
+
+
+def arrivals(delays):
+    # (arrival ms, sequence, capture timestamp) for frames sent every FRAME_MS
+    return sorted(
+        (sequence * FRAME_MS + delay, sequence, sequence * FRAME_MS)
+        for sequence, delay in enumerate(delays)
+    )
+
+
+def play(trace, jitter, clock):
+    # Puts each frame as it arrives and calls get() every FRAME_MS, like the
+    # playout thread. Returns (playout time, depth after get, sequence played or None)
+    ticks = []
+    pending = iter(trace)
+    arrival = next(pending, None)
+    for tick in range(0, int(trace[-1][0]) + 10 * FRAME_MS, FRAME_MS):
+        while arrival is not None and arrival[0] <= tick:
+            clock[0] = arrival[0] / 1000
+            jitter.put(PAYLOAD, arrival[1], arrival[2])
+            arrival = next(pending, None)
+        clock[0] = tick / 1000
+        played = None
+        if jitter.get() is not None:
+            played = jitter.played_timestamp // FRAME_MS
+        ticks.append((tick, jitter.depth_ms, played))
+    return ticks
+
+
+def test_depth_returns_to_target_after_jitter():
+    rng = random.Random(3)
+    # 5 s calm, 10 s of 0-150 ms jitter, then 15 s calm
+    delays = [30] * 250 + [30 + rng.uniform(0, 150) for _ in range(500)] + [30] * 750
+    clock = [0.0]
+    jitter = voip_jitter.JitterBuffer(frame_ms=FRAME_MS, clock=lambda: clock[0])
+    ticks = play(arrivals(delays), jitter, clock)
+    jittery = [depth for tick, depth, _ in ticks if 5000 <= tick < 15000]
+    calm = [depth for tick, depth, _ in ticks if 20000 <= tick < 30000]
+    assert max(jittery) > 3 * FRAME_MS
+    assert jitter.target_delay_ms == jitter.min_delay_ms
+    # Within a frame of the target once the next frame arrives
+    assert max(calm) <= jitter.target_delay_ms
+
+
+def test_steady_arrivals_play_without_loss():
+    clock = [0.0]
+    jitter = voip_jitter.JitterBuffer(frame_ms=FRAME_MS, clock=lambda: clock[0])
+    play(arrivals([30] * 200), jitter, clock)
+    stats = jitter.stats()
+    assert stats["played"] == 200
+    assert stats["lost"] == stats["late"] == stats["dropped"] == 0
+
+
+def test_reordered_frames_play_in_sequence():
+    clock = [0.0]
+    jitter = voip_jitter.JitterBuffer(frame_ms=FRAME_MS, min_delay_ms=3 * FRAME_MS, clock=lambda: clock[0])
+    delays = [30] * 100
+    delays[40] += FRAME_MS + 5  # Arrives just after 41
+    played = [sequence for _, _, sequence in play(arrivals(delays), jitter, clock) if sequence is not None]
+    assert played == list(range(100))
+    assert jitter.stats()["late"] == 0
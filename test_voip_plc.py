@@ -0,0 +1,152 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Concealment and FEC under fixed loss masks, 1 marking a lost frame
+
+import math
+
+import numpy as np
+import pytest
+
+import voip_codec
+import voip_jitter
+import voip_plc
+import voip_protocol
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+
+def voiced_frames(count, frequency=190.0):
+    # A steady vowel-like tone whose period does not divide the frame
+    t = np.arange(count * FRAME_SAMPLES) / SAMPLE_RATE
+    voice = sum(np.sin(2 * np.pi * k * frequency * t) / k for k in range(1, 4))
+    return (voice * 6000).astype(voip_plc.PCM).reshape(count, FRAME_SAMPLES)
+
+
+def snr_db(reference, output):
+    reference = reference.astype(np.float64)
+    error = output.astype(np.float64) - reference
+    return 10 * math.log10(np.sum(reference ** 2) / max(np.sum(error ** 2), 1e-9))
+
+
+def conceal_stream(frames, mask, concealer):
+    # Plays each frame, or what the concealer makes up for a lost one
+    output = []
+    for samples, lost in zip(frames, mask):
+        if lost:
+            payload = concealer.conceal(2 * FRAME_SAMPLES) if concealer else None
+            payload = payload or bytes(2 * FRAME_SAMPLES)
+        else:
+            payload = samples.tobytes()
+            if concealer is not None:
+                payload = concealer.played(payload)
+        output.append(np.frombuffer(payload, voip_plc.PCM))
+    return np.concatenate(output)
+
+
+def fec_stream(frames, mask, copies):
+    # Frames through FecEncoder, split_redundant and JitterBuffer.recover. Returns
+    # the jitter buffer and the audio it played for each sequence number
+    clock = [0.0]
+    jitter = voip_jitter.JitterBuffer(
+        SAMPLE_RATE, frame_ms=FRAME_MS, min_delay_ms=2 * FRAME_MS, clock=lambda: clock[0]
+    )
+    encoder = voip_plc.FecEncoder(copies)
+    played = {}  # sequence -> PCM played
+    for sequence, (samples, lost) in enumerate(zip(frames, mask)):
+        clock[0] = sequence * FRAME_MS / 1000
+        pcm = samples.tobytes()
+        data = encoder.encode(voip_protocol.PCM16, pcm, pcm, sequence, sequence * FRAME_MS)
+        if not lost:
+            frame, redundant = voip_protocol.split_redundant(voip_protocol.decode_frame(data))
+            for copy in redundant:
+                jitter.recover(voip_codec.decode(copy.type, copy.payload), copy.sequence, copy.timestamp)
+            jitter.put(bytes(frame.payload), frame.sequence, frame.timestamp)
+        payload = jitter.get()
+        if payload is not None:
+            played[jitter.played_timestamp // FRAME_MS] = payload
+    return jitter, played
+
+
+MASK = [0, 0, 0, 0, 1, 0, 0, 0, 1, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0]
+
+
+@pytest.mark.parametrize("mode", voip_plc.MODES)
+def test_concealer_fills_every_lost_frame(mode):
+    frames = voiced_frames(len(MASK))
+    concealer = voip_plc.Concealer(SAMPLE_RATE, mode)
+    conceal_stream(frames, MASK, concealer)
+    assert concealer.concealed == sum(MASK)
+
+
+def test_pitch_concealment_beats_silence():
+    frames = voiced_frames(len(MASK))
+    silence = snr_db(frames.ravel(), conceal_stream(frames, MASK, None))
+    pitch = snr_db(frames.ravel(), conceal_stream(frames, MASK, voip_plc.Concealer(SAMPLE_RATE, "pitch")))
+    assert pitch > silence + 3
+
+
+def test_concealment_fades_to_silence():
+    frames = voiced_frames(8)
+    concealer = voip_plc.Concealer(SAMPLE_RATE, "pitch", fade_ms=3 * FRAME_MS)
+    concealer.played(frames[0].tobytes())
+    payloads = [concealer.conceal(2 * FRAME_SAMPLES) for _ in range(4)]
+    assert all(payload is not None for payload in payloads[:3])
+    assert payloads[3] is None
+
+
+def test_default_mode_is_pitch():
+    assert voip_plc.Concealer().mode == "pitch"
+
+
+@pytest.mark.parametrize("copies, mask, recovered", [
+    (1, [0, 0, 0, 1, 0, 0, 1, 0, 0, 0], 2),  # Single losses
+    (1, [0, 0, 0, 1, 1, 0, 0, 0, 0, 0], 1),  # A burst of two, one copy back
+    (2, [0, 0, 0, 1, 1, 0, 0, 0, 0, 0], 2),
+    (2, [0, 0, 0, 1, 1, 1, 0, 0, 0, 0], 2),  # The oldest of three is out of reach
+])
+def test_fec_recovers_lost_frames(copies, mask, recovered):
+    jitter, _ = fec_stream(voiced_frames(len(mask)), mask, copies)
+    assert jitter.recovered == recovered
+
+
+def test_recovered_audio_matches_the_adpcm_copy():
+    frames = voiced_frames(10)
+    _, played = fec_stream(frames, [0, 0, 0, 0, 1, 0, 0, 0, 0, 0], 1)
+    assert 4 in played
+    assert snr_db(frames[4], np.frombuffer(played[4], voip_plc.PCM)) > 20
+
+
+def test_recover_keeps_only_missing_frames():
+    jitter = voip_jitter.JitterBuffer(SAMPLE_RATE, frame_ms=FRAME_MS, clock=lambda: 0.0)
+    payload = bytes(2 * FRAME_SAMPLES)
+    assert not jitter.recover(payload, 0)  # Nothing received yet to place it against
+    jitter.put(payload, 5, 100)
+    assert not jitter.recover(payload, 5)  # Already there
+    assert not jitter.recover(payload, 4)  # Before the next frame to play
+    assert jitter.recover(payload, 6)
+    assert not jitter.recover(payload, 6)
+    assert jitter.recovered == 1
@@ -0,0 +1,116 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# FrameDecoder and the frame helpers on hand-built byte streams
+
+import pytest
+
+import voip_protocol
+
+PAYLOADS = [bytes(range(10)), b"", bytes(640), b"\x56\x01" * 20]
+
+
+def stream():
+    return b"".join(
+        voip_protocol.encode_frame(voip_protocol.PCM16, payload, sequence, sequence * 20)
+        for sequence, payload in enumerate(PAYLOADS)
+    )
+
+
+def feed(decoder, chunks):
+    # Copies each payload out before the next read, since the decoder's views
+    # point into the buffer it was given
+    return [(frame.sequence, bytes(frame.payload)) for chunk in chunks for frame in decoder.feed(chunk)]
+
+
+def expected():
+    return list(enumerate(PAYLOADS))
+
+
+def test_several_frames_in_one_read():
+    assert feed(voip_protocol.FrameDecoder(), [stream()]) == expected()
+
+
+@pytest.mark.parametrize("cut", [1, voip_protocol.HEADER_SIZE - 1, voip_protocol.HEADER_SIZE, voip_protocol.HEADER_SIZE + 4])
+def test_frame_split_across_reads(cut):
+    # Cuts inside the first header, right after it and inside the payload
+    data = stream()
+    decoder = voip_protocol.FrameDecoder()
+    assert feed(decoder, [data[:cut], data[cut:]]) == expected()
+    assert not decoder.pending
+
+
+def test_one_byte_reads():
+    data = stream()
+    assert feed(voip_protocol.FrameDecoder(), [data[i:i + 1] for i in range(len(data))]) == expected()
+
+
+def test_bad_magic_raises():
+    data = bytearray(stream())
+    data[0] = 0x00
+    with pytest.raises(voip_protocol.ProtocolError):
+        voip_protocol.FrameDecoder().feed(data)
+
+
+def test_bad_magic_in_a_pending_header_raises():
+    data = bytearray(voip_protocol.encode_frame(voip_protocol.PCM16, bytes(4), 0))
+    data[1] = voip_protocol.VERSION + 1
+    decoder = voip_protocol.FrameDecoder()
+    assert decoder.feed(data[:2]) == []
+    with pytest.raises(voip_protocol.ProtocolError):
+        decoder.feed(data[2:])
+
+
+def test_decode_frame_checks_length():
+    data = voip_protocol.encode_frame(voip_protocol.PCM16, bytes(8), 7)
+    assert voip_protocol.decode_frame(data).sequence == 7
+    with pytest.raises(voip_protocol.ProtocolError):
+        voip_protocol.decode_frame(data[:-1])
+    with pytest.raises(voip_protocol.ProtocolError):
+        voip_protocol.decode_frame(data[:voip_protocol.HEADER_SIZE - 1])
+
+
+def test_split_redundant_returns_audio_and_copies():
+    blocks = [(voip_protocol.ADPCM, 2, 40, b"old"), (voip_protocol.ADPCM, 1, 20, b"newer")]
+    data = voip_protocol.encode_redundant(voip_protocol.ULAW, b"audio", blocks, 10, 200)
+    primary, copies = voip_protocol.split_redundant(voip_protocol.decode_frame(data))
+    assert (primary.type, primary.sequence, bytes(primary.payload)) == (voip_protocol.ULAW, 10, b"audio")
+    assert [(copy.sequence, copy.timestamp, bytes(copy.payload)) for copy in copies] == [
+        (8, 160, b"old"), (9, 180, b"newer"),
+    ]
+
+
+@pytest.mark.parametrize("cut, message", [
+    (0, "empty"),
+    (1 + voip_protocol.REDUNDANT_BLOCK.size - 1, "truncated redundant block header"),
+    (1 + voip_protocol.REDUNDANT_BLOCK.size + 2, "truncated redundant block"),
+])
+def test_split_redundant_truncated(cut, message):
+    blocks = [(voip_protocol.ADPCM, 1, 20, b"copy")]
+    frame = voip_protocol.decode_frame(
+        voip_protocol.encode_redundant(voip_protocol.PCM16, b"audio", blocks, 1, 20)
+    )
+    frame = frame._replace(payload=frame.payload[:cut])
+    with pytest.raises(voip_protocol.ProtocolError, match=message):
+        voip_protocol.split_redundant(frame)
@@ -0,0 +1,205 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# RelayServer on loopback, against plain sockets and headless Clients
+
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+import voip
+import voip_audio
+import voip_protocol
+import voip_server
+
+DATAGRAM_SIZE = voip_protocol.HEADER_SIZE + voip_protocol.MAX_DATAGRAM_PAYLOAD
+
+
+class Relay:
+    # A RelayServer on its own event loop thread
+    def __init__(self, **options):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = voip_server.RelayServer(host="127.0.0.1", port=0, **options)
+        self.run(self.server.start())
+        self.port = self.server.port
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(5)
+
+    def drop_connections(self):
+        async def drop():
+            for connection in list(self.server.connections):
+                connection.close()
+        self.run(drop())
+
+    def close(self):
+        self.run(self.server.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+@pytest.fixture
+def relay():
+    relay = Relay(transport="both")
+    yield relay
+    relay.close()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def tcp_socket(relay, client_id):
+    sock = socket.create_connection(("127.0.0.1", relay.port), 5)
+    sock.sendall(client_id)
+    return sock
+
+
+def read_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        assert chunk, "relay closed the connection"
+        data += chunk
+    return bytes(data)
+
+
+def hello(client_id, payload_types=()):
+    return voip_protocol.encode_frame(
+        voip_protocol.HELLO, client_id, voip_server.SAMPLE_RATE,
+        flags=voip_protocol.codec_mask(payload_types),
+    )
+
+
+class FlakyClient(voip.Client):
+    # Fails the next failures connects, so audio queues while it backs off
+    failures = 0
+
+    def connect_stream(self):
+        if self.failures:
+            self.failures -= 1
+            return
+        super().connect_stream()
+
+
+def client(relay, client_id, client_class=voip.Client, **settings):
+    client = client_class()
+    client.dst_port = relay.port
+    client.client_id = client_id
+    client.timeout = 1
+    client.source = voip_audio.SineSource()
+    client.sink = voip_audio.NullSink()
+    for name, value in settings.items():
+        setattr(client, name, value)
+    return client
+
+
+def test_raw_peers_get_whole_samples(relay):
+    a, b = tcp_socket(relay, b"raw"), tcp_socket(relay, b"raw")
+    assert wait_for(lambda: len(relay.server.calls.get("raw", ())) == 2)
+    # Odd sized writes, each held apart so the relay reads them one at a time
+    for chunk in (bytes(3), bytes(5), bytes(1), bytes(7)):
+        a.sendall(chunk)
+        time.sleep(0.02)
+    assert len(read_exactly(b, 16)) == 16
+    a.close()
+    b.close()
+
+
+def test_tcp_frames_fit_udp_datagrams(relay):
+    tcp = tcp_socket(relay, b"")
+    tcp.sendall(hello(b"mixed"))
+    udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp.settimeout(1)
+    udp.connect(("127.0.0.1", relay.port))
+    udp.send(hello(b"mixed", (voip_protocol.ADPCM, voip_protocol.REDUNDANT)))
+    assert wait_for(lambda: len(relay.server.calls.get("mixed", ())) == 2)
+    # 60 ms of PCM, then 40 ms carrying a copy of an earlier frame: each fits a
+    # TCP frame but not a datagram
+    tcp.sendall(voip_protocol.encode_frame(voip_protocol.PCM16, bytes(1920), 1, 60))
+    blocks = [(voip_protocol.ADPCM, 1, 60, bytes(324))]
+    tcp.sendall(voip_protocol.encode_redundant(voip_protocol.PCM16, bytes(1280), blocks, 2, 120))
+    received = 0
+    while received < 1920 + 1280:
+        datagram = udp.recv(2 * DATAGRAM_SIZE)
+        assert len(datagram) <= DATAGRAM_SIZE
+        frame = voip_protocol.decode_frame(datagram)
+        if frame.type == voip_protocol.PCM16:
+            received += len(frame.payload)
+    assert received == 1920 + 1280
+    tcp.close()
+    udp.close()
+
+
+@pytest.mark.parametrize("framing", [False, True])
+def test_client_reconnects_after_the_relay_drops_it(relay, framing):
+    client_ids = []
+    receive_client_id = voip_server.Endpoint.receive_client_id
+
+    def record(endpoint, data):
+        client_ids.append(bytes(data))
+        receive_client_id(endpoint, data)
+
+    # The ring holds the whole backoff, so whatever it drops was dropped for the reconnect
+    a = client(relay, "drop", FlakyClient, framing=framing, reconnect_backoff=0.3, capture_buffer_ms=1000)
+    b = client(relay, "drop", framing=framing)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(voip_server.Endpoint, "receive_client_id", record)
+        call_a, call_b = a.start_call(), b.start_call()
+        assert wait_for(lambda: call_b.stats.frames_received > 10)
+        a.failures = 1
+        relay.drop_connections()
+        assert call_a.wait_for_state(voip.RECONNECTING, 5)
+        assert call_a.wait_for_state(voip.ACTIVE, 5)
+        assert call_b.wait_for_state(voip.ACTIVE, 5)
+        received = call_b.stats.frames_received
+        assert wait_for(lambda: call_b.stats.frames_received > received + 10)
+    assert client_ids and all(client_id == b"drop" for client_id in client_ids)
+    if not framing:
+        assert call_a.capture.dropped_bytes > 0  # Queued during the backoff, not sent after the client_id
+    call_a.end()
+    call_b.end()
+
+
+def test_udp_clients_redial(relay):
+    a = client(relay, "redial", framing=True, transport="udp")
+    b = client(relay, "redial", framing=True, transport="udp")
+    for _ in range(2):
+        call_a, call_b = a.start_call(), b.start_call()
+        assert a.udp and b.udp
+        assert wait_for(lambda: call_a.stats.frames_received > 10 and call_b.stats.frames_received > 10)
+        call_a.end()
+        call_b.end()
+    assert wait_for(lambda: not relay.server.datagram_relay.endpoints and not relay.server.calls)
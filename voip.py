@@ -22,56 +22,974 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from kivy.logger import Logger
-from kivy.utils import platform
+try:
+    from kivy.logger import Logger
+    from kivy.utils import platform
+except ImportError:  # Headless hosts such as servers and CI run without Kivy
+    import logging
+    import sys
+    Logger = logging.getLogger("voip")
+    platform = sys.platform
+import functools
 import threading
+import time
+import voip_jitter
+import voip_protocol
+import voip_ring
+import voip_stats
+
+# Loaded by load_codecs. NumPy takes longer to import than the rest of the app,
+# so it waits for the first call (or Client.prewarm) instead of slowing startup
+voip_codec = None
+voip_vad = None
+voip_plc = None
+codecs_loaded = False
+bindings_lock = threading.Lock()
+
+
+def load_codecs():
+    global voip_codec, voip_vad, voip_plc, codecs_loaded
+    with bindings_lock:
+        if codecs_loaded:
+            return
+        try:
+            import voip_codec as codec
+            import voip_vad as vad
+            import voip_plc as plc
+            voip_codec, voip_vad, voip_plc = codec, vad, plc
+        except ImportError:  # NumPy is only needed for the compressed codecs, VAD, PLC and FEC
+            pass
+        codecs_loaded = True
+
+
+# Call states reported by Call.state
+IDLE = "idle"
+CONNECTING = "connecting"
+ACTIVE = "active"
+RECONNECTING = "reconnecting"
+ENDED = "ended"
+FAILED = "failed"
+
+RECONNECT_MAX_BACKOFF = 4.0  # secs, the cap for the doubling delay between reconnect attempts
+WARM_KEEPALIVE_INTERVAL = 2.0  # secs between pings that keep a framed warm connection open
+WARM_CONNECTION_TTL = 4.0  # secs a raw warm connection is kept, under the server's client_id timeout
+UDP_HELLO_INTERVAL = 1.0  # secs between repeated client_id datagrams
+COMFORT_NOISE_INTERVAL = 0.2  # secs between comfort noise markers during silence
+PING_INTERVAL = 1.0  # secs between round trip measurements on framed calls
+PACKET_TIMES = (10, 20, 40, 60)  # ms of audio per packet that Client.packet_ms accepts
+PACKET_WAIT = 0.1  # secs the network thread waits for captured audio before checking the call
+RECEIVE_BUFFER_SIZE = 4096  # Bytes per socket read, room for several frames per read
+# The relay keeps datagrams within a frame of MAX_DATAGRAM_PAYLOAD, including a MUX frame's inner header
+DATAGRAM_BUFFER_SIZE = voip_protocol.HEADER_SIZE + voip_protocol.MAX_DATAGRAM_PAYLOAD
+MAX_CHANNEL = 255  # Calls sharing one connection, beyond the one it was opened for
+# Frames that show a connection carries the call, rather than being dropped after it opens
+MEDIA_TYPES = voip_protocol.AUDIO_TYPES | {voip_protocol.REDUNDANT, voip_protocol.COMFORT_NOISE}
+
+
+class Call:
+    """A call started by Client.start_call.
+
+    Each call has its own state, stats and audio pipeline, held in __slots__
+    so calls never share anything by accident. A call started while others
+    are live, such as a waiting call or a supervisor listening in, shares
+    their connection: the first call on a connection sends plain frames and
+    later ones are multiplexed on channels (see voip_protocol.MUX), which
+    needs a framed connection.
+
+    Callbacks receive (call, state) on the thread that changed it, often a
+    stream thread, so UI code should hand them to the main thread (e.g. with
+    kivy.clock.Clock.schedule_once).
+    """
+
+    __slots__ = (
+        "client", "client_id", "channel", "state", "state_changed", "state_callbacks",
+        "stats", "reporter", "active", "failed",
+        "capture", "send_buffer", "send_sequence", "comfort_noise_sent", "pong_timestamp",
+        "encoder", "send_type", "detector", "fec_encoder", "peer_fec",
+        "jitter", "comfort_noise", "concealer", "received_sequence",
+        "source", "sink", "record_thread", "playout_thread",
+    )
+
+    def __init__(self, client, client_id):
+        self.client = client
+        self.client_id = client_id
+        self.channel = None  # Set once the call has a place on the connection
+        self.state = IDLE
+        self.state_changed = threading.Condition()
+        self.state_callbacks = list(client.state_callbacks)
+        self.stats = voip_stats.CallStats()
+        self.reporter = None
+        self.active = False
+        self.failed = False
+        self.capture = None  # AudioRing from capture to network thread
+        self.send_buffer = None
+        self.send_sequence = 0
+        self.comfort_noise_sent = None
+        self.pong_timestamp = None
+        self.encoder = None
+        self.send_type = voip_protocol.PCM16
+        self.detector = None
+        self.fec_encoder = None
+        self.peer_fec = False
+        self.jitter = None
+        self.comfort_noise = None
+        self.concealer = None
+        self.received_sequence = None
+        self.source = None  # Microphone: an AudioRecord on Android, a voip_audio source headless
+        self.sink = None  # Speaker: an AudioTrack on Android, a voip_audio sink headless
+        self.record_thread = None
+        self.playout_thread = None
+
+    def end(self):
+        self.client.end_call(self)
+
+    def subscribe(self, callback):
+        self.state_callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.state_callbacks:
+            self.state_callbacks.remove(callback)
+
+    def set_state(self, state):
+        with self.state_changed:
+            if self.state == state:
+                return
+            self.state = state
+            self.state_changed.notify_all()
+        for callback in list(self.state_callbacks):
+            callback(self, state)
+
+    def wait_for_state(self, states, timeout=None):
+        # Blocks until the call reaches one of states. Returns the state, or None on timeout
+        if isinstance(states, str):
+            states = (states,)
+        with self.state_changed:
+            if self.state_changed.wait_for(lambda: self.state in states, timeout):
+                return self.state
+        return None
+
+    def wait_until_ended(self, timeout=None):
+        return self.wait_for_state((ENDED, FAILED), timeout)
+
+    def start_reporting(self, callback, interval):
+        # callback gets (call, snapshot), so calls sharing a client can be told apart
+        if callback is not None:
+            self.reporter = voip_stats.StatsReporter(
+                self.stats, functools.partial(callback, self), interval
+            )
+            self.reporter.start()
+
+    def finish(self):
+        if self.reporter is not None:
+            self.reporter.stop()
+            self.reporter = None
+        if self.state not in (ENDED, FAILED):
+            self.set_state(FAILED if self.failed else ENDED)
+
+
+class CallEvents:
+    # Connection and audio pipeline shared by the platform clients. Every call
+    # of a Client goes over one connection, see Call. Methods that take a call
+    # work on that call's pipeline. The platform Clients add their audio
+    # settings and write_speaker, which hands audio to the call's speaker
+    # Variables to be configured per client
+    client_id = ""  # Used to identify/authenticate client's connection. start_call can override it
+    dst_address = "127.0.0.1"  # Use root domain for ssl connection
+    dst_port = 8080
+    timeout = 5  # Sets WAN timeout. LAN connection max is 2 secs.
+    ssl = False
+    tls_version = ""  # Defaults to auto selection. TLSv1.3 and TLSv1.2 are options
+    stats_callback = None  # Called with (call, call.stats snapshot) every stats_interval secs of each call
+    stats_interval = 1.0
+    debug = False
+    # Pipeline variables. The iOS Voip.framework streams raw PCM itself, so only Android and headless use them
+    framing = False  # Sends sequence-numbered frames (see voip_protocol). Raw PCM by default
+    transport = "tcp"  # "udp" sends one frame per datagram. Falls back to TCP if UDP is unavailable
+    jitter_buffer = True  # Smooths network jitter before the speaker. False plays audio as it arrives
+    codec = "pcm"  # "ulaw" (2:1) and "adpcm" (4:1) compress audio. Requires NumPy, enables framing
+    vad = False  # Sends comfort noise markers instead of silence. Requires NumPy, enables framing
+    plc = "pitch"  # Lost frames: "pitch" repeats the last pitch period, "fade" the last frame, "" is silence. Requires NumPy
+    fec = 0  # ADPCM copies of that many earlier frames sent with each packet. Requires NumPy, enables framing
+    reconnect_attempts = 5  # Reconnects a dropped call, resending client_id. 0 ends the call instead
+    reconnect_backoff = 0.25  # secs between the first attempts, doubling up to RECONNECT_MAX_BACKOFF
+    warm_connection = False  # prewarm() also connects, so start_call skips the TCP and TLS handshakes
+    packet_ms = 20  # Audio per packet: 10, 20, 40 or 60. Longer packets mean fewer writes but more delay
+    capture_buffer_ms = 200  # Audio held while the network catches up, then the oldest is dropped
+    SAMPLE_RATE = 16000  # Framed calls announce it and the relay resamples between peers. Raw PCM is 16000
+
+    def __init__(self):
+        self.state_callbacks = []  # Given to every call, see subscribe
+        self.engine_lock = threading.Lock()
+        self.engine_loaded = False
+        self.call_ending = threading.Event()  # Set when the last call ends
+        # Held while the connection is opened or replaced, see connection_lost
+        self.reconnect_lock = threading.Lock()
+        self.generation = 0  # Incremented by every reconnect
+        self.audio_received = False  # Audio arrived on the connection since it was opened
+        self.failed_reconnects = 0  # Reconnects since audio last arrived, see connection_lost
+        self.raw_remainder = b""  # Odd byte of the last raw read, see play
+        self.warm = False  # Connected by prewarm and not yet used by a call
+        self.warm_since = 0
+        self.calls_lock = threading.Lock()
+        self.calls_by_channel = {}  # channel -> live Call on the connection
+        # Calls on one connection write from their own threads. reconnect holds it
+        # until the client_ids are sent, around send_client_id's own writes
+        self.write_lock = threading.RLock()
+        self.reader_thread = None
+        self.connection_stats = voip_stats.CallStats()  # The connection's setup is recorded here
+        self.socket = None
+        self.udp = False
+        self.framed = False
+        self.connected = False
+
+    def prewarm(self, background=True):
+        # Loads the platform bindings and audio objects ahead of the first call,
+        # which otherwise loads them itself. Safe to call from App.on_start
+        if background:
+            threading.Thread(target=self.warm_up, daemon=True).start()
+        else:
+            self.warm_up()
+
+    def warm_up(self):
+        self.ensure_engine()
+        self.open_warm_connection()
+
+    def ensure_engine(self):
+        with self.engine_lock:
+            if not self.engine_loaded:
+                load_codecs()
+                self.load_engine()
+                self.engine_loaded = True
+
+    def load_engine(self):
+        pass
+
+    @property
+    def calls(self):
+        # Live calls, in channel order
+        with self.calls_lock:
+            return [self.calls_by_channel[channel] for channel in sorted(self.calls_by_channel)]
+
+    def subscribe(self, callback):
+        # callback(call, state) is called for every call of this client
+        self.state_callbacks.append(callback)
+        for call in self.calls:
+            call.subscribe(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.state_callbacks:
+            self.state_callbacks.remove(callback)
+        for call in self.calls:
+            call.unsubscribe(callback)
+
+    def new_call(self, client_id):
+        if self.debug:
+            Logger.info("VOIP: Starting call")
+        self.ensure_engine()
+        call = Call(self, self.client_id if client_id is None else client_id)
+        call.set_state(CONNECTING)
+        return call
+
+    def wants_framing(self):
+        return self.framing or self.codec != "pcm" or self.vad or self.fec > 0
+
+    def open_warm_connection(self):
+        if not self.warm_connection or self.transport != "tcp":
+            return
+        with self.reconnect_lock:
+            if self.calls_by_channel or self.warm:
+                return
+            self.udp = False
+            self.framed = self.wants_framing()
+            self.connected = False
+            self.connect_stream()
+            if not self.connected:
+                return
+            self.warm = True
+            self.warm_since = time.monotonic()
+        if self.debug:
+            Logger.info("VOIP: Warm connection ready")
+        threading.Thread(target=self.keep_warm, daemon=True).start()
+
+    def adopt_warm_connection(self):
+        # Returns True if the call can start on the connection opened by prewarm.
+        # Called with reconnect_lock held
+        if not self.warm:
+            return False
+        self.warm = False
+        fresh = (
+            self.connected
+            and self.transport == "tcp"
+            and self.framed == self.wants_framing()
+            and (self.framed or time.monotonic() - self.warm_since < WARM_CONNECTION_TTL)
+        )
+        if fresh:
+            self.connection_stats.warm_connection = True
+        else:
+            self.close_connection()
+            self.connected = False
+        return fresh
+
+    def keep_warm(self):
+        # Framed warm connections ping so the server does not time out their client_id.
+        # A raw one cannot without switching the server to framing, so it is only
+        # used while younger than WARM_CONNECTION_TTL
+        while True:
+            time.sleep(WARM_KEEPALIVE_INTERVAL)
+            with self.reconnect_lock:
+                if not self.warm:
+                    return
+                if not self.framed:
+                    continue
+                try:
+                    self.send_control(None, voip_protocol.PING, voip_protocol.timestamp_ms())
+                except STREAM_ERRORS:
+                    self.warm = False
+                    self.close_connection()
+                    self.connected = False
+                    return
+
+    def place_call(self, call):
+        # Starts call on the connection, opening it unless other calls already have
+        self.configure_codec(call)
+        self.configure_vad(call)
+        with self.reconnect_lock:
+            call.channel = self.open_channel(call)
+            if call.channel is not None:
+                call.active = True
+                self.create_ring(call)
+                self.open_speaker(call)
+                with self.calls_lock:
+                    self.calls_by_channel[call.channel] = call
+                if call.client_id != "" or self.framed:
+                    self.send_client_id(call)
+                call.record_thread = threading.Thread(
+                    target=self.send_audio, args=(call,), daemon=True
+                )
+                call.record_thread.start()
+                if self.reader_thread is None:
+                    self.reader_thread = threading.Thread(target=self.receive_audio, daemon=True)
+                    self.reader_thread.start()
+        if call.channel is None:
+            call.set_state(FAILED)
+        else:
+            call.set_state(ACTIVE)
+            call.start_reporting(self.stats_callback, self.stats_interval)
+
+    def open_channel(self, call):
+        # Returns the call's channel, or None if it can not be placed. Called with
+        # reconnect_lock held
+        if self.calls_by_channel:
+            if not self.framed:
+                if self.debug:
+                    Logger.error("VOIP: Calls can only share a framed connection, set Client.framing")
+                return None
+            # Channel 0 is only used by the call that opened the connection, so a
+            # plain client_id never arrives on a connection already carrying calls
+            for channel in range(1, MAX_CHANNEL + 1):
+                if channel not in self.calls_by_channel:
+                    return channel
+            if self.debug:
+                Logger.error(f"VOIP: {MAX_CHANNEL + 1} calls already share the connection")
+            return None
+        self.connection_stats = call.stats  # The call the connection is opened for
+        self.call_ending.clear()
+        self.audio_received = False
+        self.failed_reconnects = 0
+        self.raw_remainder = b""
+        if self.adopt_warm_connection():
+            if self.debug:
+                Logger.info("VOIP: Using warm connection")
+        else:
+            self.connected = False
+            if self.debug:
+                Logger.info(f"VOIP: {self.timeout} sec(s) wait for connection")
+            self.udp = False
+            self.framed = self.wants_framing()
+            if self.transport == "udp":
+                self.connect_datagram()
+            if not self.connected:
+                self.connect_stream()
+        return 0 if self.connected else None
+
+    def end_call(self, call=None):
+        # Ends call, or every call when None
+        for call in self.calls if call is None else [call]:
+            self.hang_up(call)
+
+    def hang_up(self, call):
+        if self.debug:
+            Logger.info("VOIP: Ending call")
+        call.active = False
+        with self.calls_lock:
+            live = self.calls_by_channel.get(call.channel) is call
+            if live:
+                del self.calls_by_channel[call.channel]
+            last = live and not self.calls_by_channel
+        if live and self.framed:
+            # Sent for the last call too, since a UDP server can not see the socket close
+            self.send_hang_up(call)
+        if last:
+            self.call_ending.set()
+            self.close_connection()  # Wakes the threads blocked on the socket
+        if call.record_thread is not None and call.record_thread is not threading.current_thread():
+            call.record_thread.join()
+        if last:
+            with self.reconnect_lock:
+                reader = None
+                if not self.calls_by_channel:
+                    self.close_connection()  # In case a reconnect raced with ending the call
+                    self.connected = False
+                    reader, self.reader_thread = self.reader_thread, None
+            if reader is not None and reader is not threading.current_thread():
+                reader.join()
+        call.finish()
+        if self.debug:
+            Logger.info("VOIP: Call ended")
+
+    def send_hang_up(self, call):
+        # Tells the server the call ended, while the connection may stay up for other calls
+        frame = voip_protocol.encode_mux(call.channel, b"")
+        try:
+            self.write_packet(frame, len(frame), call.stats)
+        except STREAM_ERRORS:
+            pass  # A broken connection ends the call on the server anyway
+
+    def channel_closed(self, channel):
+        # The server rejected or dropped the call on channel
+        with self.calls_lock:
+            call = self.calls_by_channel.pop(channel, None)
+        if call is not None:
+            call.active = False
+            call.failed = True
+            if self.debug:
+                Logger.warning(f"VOIP: Server ended the call on channel {channel}")
+
+    def reading(self):
+        # The reader stops with the last call, or once a new connection has its own
+        return bool(self.calls_by_channel) and self.reader_thread is threading.current_thread()
+
+    def reconnect(self):
+        # No call's audio may reach the new connection ahead of the client_ids
+        with self.write_lock:
+            self.connected = False
+            if self.udp:
+                self.connect_datagram()
+            else:
+                self.connect_stream()
+            if self.connected:
+                self.generation += 1
+                for call in self.calls:
+                    if call.client_id != "" or self.framed:
+                        self.send_client_id(call)
+        return self.connected
+
+    def connection_lost(self, generation, error=None):
+        # Called by a stream thread when the connection fails with error. Reconnects
+        # with backoff and resends every call's client_id, so the server pairs them
+        # with the same peers again. Returns True once the calls are connected again.
+        # A reconnect only counts as working once audio arrives, so a server that
+        # accepts and then drops the call (e.g. "call is full") still backs off and
+        # fails it
+        with self.reconnect_lock:
+            if generation != self.generation:
+                return bool(self.calls_by_channel)  # Another stream thread already reconnected
+            if not self.calls_by_channel:
+                return False
+            if self.audio_received:
+                self.audio_received = False
+                self.failed_reconnects = 0
+            if self.failed_reconnects < self.reconnect_attempts:
+                for call in self.calls:
+                    call.set_state(RECONNECTING)
+                self.close_connection()
+                if self.udp and refused(error):
+                    if self.debug:
+                        Logger.warning("VOIP: Server refused UDP, falling back to TCP")
+                    self.udp = False
+                while self.failed_reconnects < self.reconnect_attempts:
+                    if self.failed_reconnects:
+                        delay = min(
+                            self.reconnect_backoff * 2 ** (self.failed_reconnects - 1),
+                            RECONNECT_MAX_BACKOFF,
+                        )
+                        if self.call_ending.wait(delay):
+                            return False
+                    self.failed_reconnects += 1
+                    if self.debug:
+                        Logger.info(f"VOIP: Reconnecting, attempt {self.failed_reconnects}")
+                    for call in self.calls:
+                        call.stats.reconnect_attempts += 1
+                    if self.reconnect():
+                        for call in self.calls:
+                            call.stats.reconnects += 1
+                            call.set_state(ACTIVE)
+                        return True
+            with self.calls_lock:
+                calls = list(self.calls_by_channel.values())
+                self.calls_by_channel.clear()
+            for call in calls:
+                call.active = False
+                call.failed = True
+            self.close_connection()
+            self.connected = False
+            self.reader_thread = None
+            return False
+
+    def create_ring(self, call):
+        # Sized once the transport is known, since UDP caps the packet size
+        packet_ms = self.packet_ms
+        if packet_ms not in PACKET_TIMES:
+            if self.debug:
+                Logger.warning(f"VOIP: packet_ms must be one of {PACKET_TIMES}, using 20")
+            packet_ms = 20
+        bytes_per_ms = self.SAMPLE_RATE * 2 // 1000
+        headroom = 0
+        if self.framed:
+            # Multiplexed calls frame their audio twice, see voip_protocol.MUX
+            headroom = voip_protocol.HEADER_SIZE * (2 if call.channel else 1)
+        max_payload = voip_protocol.MAX_DATAGRAM_PAYLOAD - (voip_protocol.HEADER_SIZE if call.channel else 0)
+        while (
+            self.udp
+            and packet_ms > PACKET_TIMES[0]
+            and self.packet_payload(call, packet_ms * bytes_per_ms) > max_payload
+        ):
+            packet_ms = PACKET_TIMES[PACKET_TIMES.index(packet_ms) - 1]
+        slots = max(2, -(-self.capture_buffer_ms // packet_ms))
+        call.capture = voip_ring.AudioRing(slots, packet_ms * bytes_per_ms, headroom)
+        call.stats.capture = call.capture
+        # Batches of packets are joined here so TCP sends them in one write
+        call.send_buffer = bytearray(slots * (headroom + packet_ms * bytes_per_ms))
+
+    def packet_payload(self, call, size):
+        # Largest frame payload for size bytes of PCM. The peer may only play PCM,
+        # and with FEC each packet also carries ADPCM copies of earlier ones
+        if call.fec_encoder is None:
+            return size
+        copy = voip_protocol.REDUNDANT_BLOCK.size + voip_codec.encoded_size(voip_protocol.ADPCM, size)
+        return 1 + size + self.fec * copy
+
+    def prepare_playout(self, call):
+        call.comfort_noise = voip_vad.ComfortNoise() if voip_vad else None
+        if self.jitter_buffer:
+            call.jitter = voip_jitter.JitterBuffer(
+                self.SAMPLE_RATE, frame_ms=call.capture.slot_size / (self.SAMPLE_RATE * 2 / 1000)
+            )
+            call.stats.jitter = call.jitter
+            self.create_concealer(call)
+
+    def close_speaker(self, call):
+        pass
+
+    def send_audio(self, call):
+        # Network side of the capture pipeline. capture_audio fills the ring on its
+        # own thread, so a slow write never holds up the microphone
+        ring = call.capture
+        capture_thread = threading.Thread(target=self.capture_audio, args=(call, ring), daemon=True)
+        capture_thread.start()
+        hello_sent = ping_sent = time.monotonic()
+        connection = self.generation  # The connection the ring's audio was captured for
+        if self.debug:
+            Logger.info("VOIP: Microphone live stream started")
+        while call.active:
+            generation = self.generation
+            slots = ring.take(PACKET_WAIT)
+            if connection != self.generation:
+                connection = self.generation
+                if not self.framed:
+                    # Raw PCM has no boundaries, so audio queued during the reconnect would
+                    # reach the relay in the read it takes for the client_id
+                    ring.discard(slots)
+                    continue
+            try:
+                if self.framed:
+                    now = time.monotonic()
+                    # A lost UDP HELLO must not leave the call unregistered
+                    if self.udp and now - hello_sent > UDP_HELLO_INTERVAL:
+                        hello_sent = now
+                        self.send_client_id(call)
+                    if now - ping_sent > PING_INTERVAL:
+                        ping_sent = now
+                        self.send_control(call, voip_protocol.PING, voip_protocol.timestamp_ms())
+                    # Pongs are sent from this thread so the call's writes stay in
+                    # order, which can add up to one packet to the measured round trip
+                    if call.pong_timestamp is not None:
+                        self.send_control(call, voip_protocol.PONG, call.pong_timestamp)
+                        call.pong_timestamp = None
+                self.send_packets(call, ring, slots)
+            except STREAM_ERRORS as e:
+                if call.active and self.debug:
+                    Logger.error("VOIP: Microphone Stream Error")
+                    Logger.error(f"VOIP: {e}")
+                self.connection_lost(generation, e)
+            finally:
+                ring.release(slots)
+        ring.close()
+        capture_thread.join()
+        if call.playout_thread is not None:
+            call.playout_thread.join()
+        self.close_speaker(call)
+        if self.debug:
+            Logger.info("VOIP: Microphone live stream ended")
+        call.finish()
+
+    def send_packets(self, call, ring, slots):
+        # Packets are framed in place, in the header room in front of their audio
+        batch = []
+        for slot in slots:
+            buffer = ring.buffers[slot]
+            length = ring.lengths[slot]
+            if not self.framed:
+                batch.append((buffer, length))
+                continue
+            timestamp = ring.timestamps[slot]
+            pcm = ring.views[slot][ring.headroom:ring.headroom + length]
+            if call.detector is not None and not call.detector.is_speech(pcm):
+                frame = self.suppress_silence(call, timestamp, length)
+                if frame is not None:
+                    frame = self.channel_frame(call, frame)
+                    batch.append((frame, len(frame)))
+                continue
+            call.comfort_noise_sent = None
+            if call.fec_encoder is not None and call.peer_fec:
+                payload = pcm if call.send_type == voip_protocol.PCM16 else call.encoder.encode(pcm)
+                frame = call.fec_encoder.encode(
+                    call.send_type, payload, pcm, call.send_sequence, timestamp
+                )
+                call.stats.fec_bytes += len(frame) - voip_protocol.HEADER_SIZE - len(payload)
+                frame = self.channel_frame(call, frame)
+                batch.append((frame, len(frame)))
+            elif call.send_type == voip_protocol.PCM16:
+                voip_protocol.pack_header(
+                    buffer, ring.headroom - voip_protocol.HEADER_SIZE, voip_protocol.PCM16,
+                    length, call.send_sequence, timestamp,
+                )
+                if call.channel:
+                    voip_protocol.pack_header(
+                        buffer, 0, voip_protocol.MUX, voip_protocol.HEADER_SIZE + length,
+                        0, 0, call.channel,
+                    )
+                batch.append((buffer, ring.headroom + length))
+            else:
+                frame = voip_protocol.encode_frame(
+                    call.send_type, call.encoder.encode(pcm), call.send_sequence, timestamp
+                )
+                frame = self.channel_frame(call, frame)
+                batch.append((frame, len(frame)))
+            call.send_sequence += 1
+        if self.udp or len(batch) == 1:
+            for data, length in batch:
+                self.write_packet(data, length, call.stats)
+        elif batch:
+            offset = 0
+            for data, length in batch:
+                call.send_buffer[offset:offset + length] = memoryview(data)[:length]
+                offset += length
+            self.write_packet(call.send_buffer, offset, call.stats, len(batch))
+
+    def channel_frame(self, call, frame):
+        if call.channel:
+            return voip_protocol.encode_mux(call.channel, frame)
+        return frame
+
+    def client_id_packet(self, call):
+        if not self.framed:
+            return call.client_id.encode()
+        codecs = voip_codec.SUPPORTED if voip_codec else voip_protocol.codec_mask(())
+        return self.channel_frame(
+            call,
+            voip_protocol.encode_frame(
+                voip_protocol.HELLO, call.client_id.encode(), self.SAMPLE_RATE, flags=codecs
+            ),
+        )
+
+    def send_control(self, call, payload_type, timestamp):
+        # call is None for the warm connection's keepalive
+        frame = voip_protocol.encode_frame(payload_type, b"", 0, timestamp)
+        if call is None:
+            self.write_packet(frame, len(frame))
+        else:
+            frame = self.channel_frame(call, frame)
+            self.write_packet(frame, len(frame), call.stats)
+
+    def suppress_silence(self, call, timestamp, length):
+        # Silence skips the audio frame. A comfort noise marker is returned when
+        # silence starts and then every COMFORT_NOISE_INTERVAL. Markers reuse
+        # the next sequence number so the peer's jitter buffer sees no gap
+        call.stats.silent_frames += 1
+        call.stats.bytes_saved += voip_protocol.HEADER_SIZE + voip_codec.encoded_size(
+            call.send_type, length
+        )
+        now = time.monotonic()
+        if (
+            call.comfort_noise_sent is not None
+            and now - call.comfort_noise_sent < COMFORT_NOISE_INTERVAL
+        ):
+            return None
+        call.comfort_noise_sent = now
+        frame = voip_protocol.encode_frame(
+            voip_protocol.COMFORT_NOISE,
+            voip_vad.comfort_noise_payload(call.detector.noise_db),
+            call.send_sequence,
+            timestamp,
+        )
+        call.stats.bytes_saved -= len(frame)
+        return frame
+
+    def configure_codec(self, call):
+        if self.codec != "pcm":
+            if voip_codec is None:
+                if self.debug:
+                    Logger.error(f"VOIP: NumPy is required for the {self.codec} codec, sending PCM")
+            else:
+                call.encoder = voip_codec.Encoder(self.codec)
+        call.send_type = voip_protocol.PCM16 if call.encoder is None else call.encoder.payload_type
+        if self.fec > 0:
+            if voip_plc is None:
+                if self.debug:
+                    Logger.error("VOIP: NumPy is required for FEC, sending audio once")
+            else:
+                call.fec_encoder = voip_plc.FecEncoder(self.fec)
+
+    def configure_vad(self, call):
+        if self.vad:
+            if voip_vad is None:
+                if self.debug:
+                    Logger.error("VOIP: NumPy is required for VAD, sending all audio")
+            else:
+                call.detector = voip_vad.VoiceActivityDetector(self.SAMPLE_RATE)
+
+    def select_codec(self, call, peer_codecs):
+        # The server announces which codecs the peer decodes once the call is paired
+        if call.encoder is not None and peer_codecs >> call.encoder.payload_type & 1:
+            call.send_type = call.encoder.payload_type
+        else:
+            call.send_type = voip_protocol.PCM16
+        call.peer_fec = bool(peer_codecs >> voip_protocol.REDUNDANT & 1)
+        if self.debug:
+            Logger.info(f"VOIP: Sending payload type {call.send_type}")
+
+    def frame_audio(self, frame):
+        if frame.type == voip_protocol.PCM16:
+            return bytes(frame.payload)
+        if voip_codec is None or frame.type not in voip_protocol.AUDIO_TYPES:
+            return None
+        try:
+            return voip_codec.decode(frame.type, frame.payload)
+        except voip_protocol.ProtocolError:
+            return None  # The relay passes coded frames through, so the peer's bad frame is dropped here
+
+    def deliver(self, frames, seconds):
+        # Hands each frame read from the connection to its call. The read's
+        # latency is counted once, by the call of its first frame
+        for frame in frames:
+            size = voip_protocol.HEADER_SIZE + len(frame.payload)
+            channel = 0
+            if frame.type == voip_protocol.MUX:
+                channel = frame.flags
+                if not len(frame.payload):
+                    self.channel_closed(channel)
+                    continue
+                try:
+                    frame = voip_protocol.decode_frame(frame.payload)
+                except voip_protocol.ProtocolError:
+                    continue
+            call = self.calls_by_channel.get(channel)
+            if call is None:
+                continue
+            if frame.type in MEDIA_TYPES:
+                self.audio_received = True
+            call.stats.received(size, seconds)
+            seconds = None
+            self.frame_received(call, frame)
+
+    def frame_received(self, call, frame):
+        if frame.type == voip_protocol.HELLO:
+            self.select_codec(call, frame.flags)
+        elif frame.type == voip_protocol.PING:
+            call.pong_timestamp = frame.timestamp
+        elif frame.type == voip_protocol.PONG:
+            call.stats.round_trip((voip_protocol.timestamp_ms() - frame.timestamp) & 0xFFFFFFFF)
+        elif frame.type == voip_protocol.COMFORT_NOISE:
+            if call.comfort_noise is not None:
+                call.comfort_noise.update(frame.payload)
+            if call.jitter is not None:
+                call.jitter.mark_silence()
+        else:
+            if frame.type == voip_protocol.REDUNDANT:
+                frame = self.recover_frames(call, frame)
+                if frame is None:
+                    return
+            if call.jitter is None and self.udp:
+                # Without a jitter buffer to reorder them, late or duplicated datagrams
+                # are dropped rather than played behind newer audio
+                if (
+                    call.received_sequence is not None
+                    and voip_protocol.sequence_delta(frame.sequence, call.received_sequence) <= 0
+                ):
+                    return
+                call.received_sequence = frame.sequence
+            payload = self.frame_audio(frame)
+            if payload is None:
+                return
+            call.stats.frames_received += 1
+            if call.jitter is None:
+                self.record_mouth_to_ear(call, frame.timestamp)
+                self.write_speaker(call, payload)
+            else:
+                # Datagrams may arrive out of order, the jitter buffer reorders them
+                call.jitter.put(payload, frame.sequence, frame.timestamp)
+
+    def play(self, call, payload):
+        # Raw PCM read from the connection. A read can end mid-sample, so its odd
+        # byte is held back for the next one, as the relay does
+        if self.raw_remainder:
+            payload = self.raw_remainder + payload
+            self.raw_remainder = b""
+        if len(payload) % 2:
+            self.raw_remainder = payload[-1:]
+            payload = payload[:-1]
+        if not payload:
+            return
+        if call.jitter is None:
+            self.write_speaker(call, payload)
+        else:
+            call.jitter.put(payload)
+
+    def next_playout(self, call, silence):
+        # The jitter buffer's next audio for play_audio. Concealment or comfort
+        # noise fills its gaps, else silence
+        payload = call.jitter.get()
+        if payload is not None:
+            if call.comfort_noise is not None:
+                call.comfort_noise.stop()
+            if call.concealer is not None:
+                payload = call.concealer.played(payload)
+            if self.framed:
+                self.record_mouth_to_ear(call, call.jitter.played_timestamp)
+            return payload
+        payload = self.conceal(call, len(silence))
+        if payload is None:
+            if call.comfort_noise is not None and call.comfort_noise.active:
+                return call.comfort_noise.generate(len(silence))
+            return silence
+        return payload
+
+    def record_mouth_to_ear(self, call, timestamp):
+        if timestamp is not None:
+            elapsed_ms = (voip_protocol.timestamp_ms() - timestamp) & 0xFFFFFFFF
+            call.stats.mouth_to_ear.record(elapsed_ms / 1000)
+
+    def recover_frames(self, call, frame):
+        # Returns the audio of a REDUNDANT frame, after its copies of earlier
+        # frames have filled any the jitter buffer is missing
+        try:
+            primary, copies = voip_protocol.split_redundant(frame)
+        except voip_protocol.ProtocolError:
+            return None
+        if call.jitter is not None:
+            for copy in copies:
+                payload = self.frame_audio(copy)
+                if payload is not None and call.jitter.recover(payload, copy.sequence, copy.timestamp):
+                    call.stats.recovered_frames += 1
+        return primary
+
+    def create_concealer(self, call):
+        # Concealment fills the jitter buffer's gaps, so calls without one have none
+        if self.plc and voip_plc is not None:
+            call.concealer = voip_plc.Concealer(self.SAMPLE_RATE, self.plc)
+
+    def conceal(self, call, size):
+        # Audio for a frame the jitter buffer is missing, or None to play silence
+        if call.concealer is None or not call.jitter.gap:
+            return None
+        payload = call.concealer.conceal(size)
+        if payload is not None:
+            call.stats.concealed_frames += 1
+        return payload
+
 
 if platform == 'android':
-    from jnius import autoclass, JavaException
-    AudioRecord = autoclass("android.media.AudioRecord")
-    AudioSource = autoclass("android.media.MediaRecorder$AudioSource")
-    AudioFormat = autoclass("android.media.AudioFormat")
-    AudioTrack = autoclass("android.media.AudioTrack")
-    AudioManager = autoclass("android.media.AudioManager")
-    Socket = autoclass("java.net.Socket")
-    SSLSocket = autoclass("javax.net.ssl.SSLSocketFactory")
-    SocketTimer = autoclass("java.net.InetSocketAddress")
-    SSLContext = autoclass("javax.net.ssl.SSLContext")
-    SecureRandom = autoclass("java.security.SecureRandom")
-    class Client:
-        # Variables to be configured per client
-        client_id = ""  # Used to identify/authenticate client's connection
-        dst_address = "127.0.0.1"  # Use root domain for ssl connection
-        dst_port = 8080
-        timeout = 5  # Sets WAN timeout. LAN connection max is 2 secs.
-        ssl = False
-        tls_version = ""  # Defaults to auto selection. TLSv1.3 and TLSv1.2 are options
-        debug = False
+    from jnius import autoclass, cast, JavaException
+    # Java classes, looked up by load_bindings on first use since each autoclass
+    # call reflects over the whole class
+    AudioRecord = AudioSource = AudioFormat = AudioTrack = AudioManager = None
+    Socket = DatagramSocket = DatagramPacket = SSLSocket = SocketTimer = None
+    SSLContext = SecureRandom = None
+    bindings_loaded = False
+    STREAM_ERRORS = (JavaException, EOFError, voip_protocol.ProtocolError)
+
+    def timed_out(e):
+        # Reads time out after Client.timeout without audio, such as while the peer
+        # has not joined yet. The connection is still fine
+        return getattr(e, "classname", "") == "java.net.SocketTimeoutException"
+
+    def refused(e):
+        # A datagram reached a port without a UDP server, e.g. one running TCP only
+        return getattr(e, "classname", "") == "java.net.PortUnreachableException"
+
+    def load_bindings():
+        global AudioRecord, AudioSource, AudioFormat, AudioTrack, AudioManager
+        global Socket, DatagramSocket, DatagramPacket, SSLSocket, SocketTimer
+        global SSLContext, SecureRandom, bindings_loaded
+        with bindings_lock:
+            if bindings_loaded:
+                return
+            AudioRecord = autoclass("android.media.AudioRecord")
+            AudioSource = autoclass("android.media.MediaRecorder$AudioSource")
+            AudioFormat = autoclass("android.media.AudioFormat")
+            AudioTrack = autoclass("android.media.AudioTrack")
+            AudioManager = autoclass("android.media.AudioManager")
+            Socket = autoclass("java.net.Socket")
+            DatagramSocket = autoclass("java.net.DatagramSocket")
+            DatagramPacket = autoclass("java.net.DatagramPacket")
+            SSLSocket = autoclass("javax.net.ssl.SSLSocketFactory")
+            SocketTimer = autoclass("java.net.InetSocketAddress")
+            SSLContext = autoclass("javax.net.ssl.SSLContext")
+            SecureRandom = autoclass("java.security.SecureRandom")
+            bindings_loaded = True
+
+    UNDERRUN_POLL_WRITES = 50  # Speaker writes between AudioTrack underrun count reads
+    class Client(CallEvents):
+        # Connection and pipeline variables are configured as for CallEvents
         # Variables to adjust audio format and quality. Default settings recommended for iOS compatibility
-        SAMPLE_RATE = 16000
-        CHANNEL_CONFIG = AudioFormat.CHANNEL_IN_MONO
-        AUDIO_FORMAT = AudioFormat.ENCODING_PCM_16BIT
+        CHANNEL_CONFIG = 16  # AudioFormat.CHANNEL_IN_MONO
+        AUDIO_FORMAT = 2  # AudioFormat.ENCODING_PCM_16BIT
         buffer_size = 640
-        # Variables to be assigned dynamic values for VOIP services
-        socket = None
-        connected = False
-        hasPermission = False
-        data_output_stream = None
-        data_input_stream = None
-        audio_record = None
-        active_call = False
 
         def __init__(self):
+            super().__init__()
+            # Variables to be assigned dynamic values for VOIP services
+            self.hasPermission = False
+            self.data_output_stream = None
+            self.data_input_stream = None
+            self.ssl_socket_factory = None
+            self.ssl_factory_version = None
+
+        def load_engine(self):
+            load_bindings()
             min_buffer_size = AudioRecord.getMinBufferSize(
                 self.SAMPLE_RATE, self.CHANNEL_CONFIG, self.AUDIO_FORMAT
             )
             if min_buffer_size > self.buffer_size:
                 self.buffer_size = min_buffer_size
 
-        def send_client_id(self):
+        def write_packet(self, data, length, stats=None, frames=1):
+            started = time.perf_counter()
+            with self.write_lock:
+                if self.udp:
+                    self.socket.send(DatagramPacket(data, length))
+                else:
+                    self.data_output_stream.write(data, 0, length)
+            if stats is not None:
+                stats.sent(length, time.perf_counter() - started, frames)
+
+        def send_client_id(self, call):
             try:
-                self.data_output_stream.write(self.client_id.encode())
-                self.data_output_stream.flush()
+                client_id = self.client_id_packet(call)
+                self.write_packet(client_id, len(client_id), call.stats)
+                if not self.udp:
+                    self.data_output_stream.flush()
                 if self.debug:
                     Logger.info("VOIP: Client ID sent")
             except JavaException as e:
@@ -79,77 +997,105 @@ if platform == 'android':
                     Logger.info("VOIP: Client ID delivery failed")
                     Logger.error(f"VOIP: {e}")
 
-        def start_call(self):
-            if self.debug:
-                Logger.info("VOIP: Starting call")
-            self.verifyPermission()
-            if self.hasPermission:
-                self.connected = False
-                timeout = self.timeout * 1000
-                if self.debug:
-                    Logger.info(f"VOIP: {self.timeout} sec(s) wait for connection")
-                try:
-                    if self.ssl:
+        def start_call(self, client_id=None):
+            # Returns the Call. client_id defaults to Client.client_id
+            call = self.new_call(client_id)
+            self.verifyPermission(call)
+            if not self.hasPermission:
+                call.set_state(FAILED)
+            else:
+                self.place_call(call)
+            return call
+
+        def connect_stream(self):
+            timeout = self.timeout * 1000
+            try:
+                if self.ssl:
+                    if self.ssl_socket_factory is None or self.ssl_factory_version != self.tls_version:
+                        # The factory is kept so its SSLContext's session cache lets later
+                        # calls and reconnects resume the TLS session
                         if self.tls_version == "":
-                            ssl_socket_factory = SSLSocket.getDefault()
+                            self.ssl_socket_factory = SSLSocket.getDefault()
                         else:
                             ssl_context = SSLContext.getInstance(self.tls_version)
                             ssl_context.init(None, None, SecureRandom())
-                            ssl_socket_factory = ssl_context.getSocketFactory()
-                        self.socket = ssl_socket_factory.createSocket()
-                    else:
-                        self.socket = Socket()
-                    self.socket.connect(
-                        SocketTimer(self.dst_address, self.dst_port),
-                        timeout
+                            self.ssl_socket_factory = ssl_context.getSocketFactory()
+                        self.ssl_factory_version = self.tls_version
+                    # createSocket is declared to return java.net.Socket, which has no
+                    # startHandshake or getSession
+                    self.socket = cast("javax.net.ssl.SSLSocket", self.ssl_socket_factory.createSocket())
+                else:
+                    self.socket = Socket()
+                started = time.perf_counter()
+                self.socket.connect(
+                    SocketTimer(self.dst_address, self.dst_port),
+                    timeout
+                )
+                self.connection_stats.connect_ms = (time.perf_counter() - started) * 1000
+                self.socket.setSoTimeout(timeout)
+                if self.ssl:
+                    # Handshaking here rather than on the first write lets it be timed
+                    started = time.perf_counter()
+                    started_ms = time.time() * 1000
+                    self.socket.startHandshake()
+                    self.connection_stats.tls_handshake_ms = (time.perf_counter() - started) * 1000
+                    # A resumed session keeps the creation time of the handshake it resumes
+                    self.connection_stats.tls_resumed = (
+                        self.socket.getSession().getCreationTime() < started_ms
                     )
-                    self.socket.setSoTimeout(timeout)
-                    self.data_input_stream = self.socket.getInputStream()
-                    self.data_output_stream = self.socket.getOutputStream()
-                    self.connected = True
-                    if self.debug:
-                        Logger.info(f"VOIP: Connected to {self.dst_address}:{self.dst_port}")
-                except JavaException as e:
-                    if self.debug:
-                        Logger.error(
-                            "VOIP: "
-                            "Ensure INTERNET and ACCESS_NETWORK_STATE permissions are in buildozer.spec "
-                            "and server is available."
-                        )
-                        Logger.error(f"VOIP: {e}")
-                if self.connected:
-                    self.active_call = True
-                    if self.client_id != "":
-                        self.send_client_id() 
-                    self.record_thread = threading.Thread(target=self.send_audio, daemon=True)
-                    self.record_thread.start()
-                    self.listening_thread = threading.Thread(target=self.receive_audio, daemon=True)
-                    self.listening_thread.start()
-
-        def end_call(self):
-            if self.debug:
-                Logger.info("VOIP: Ending call")
-            self.active_call = False
-            if hasattr(self, "record_thread") and self.record_thread.is_alive():
-                self.record_thread.join()
-            if hasattr(self, "listening_thread") and self.listening_thread.is_alive():
-                self.listening_thread.join()
+                self.data_input_stream = self.socket.getInputStream()
+                self.data_output_stream = self.socket.getOutputStream()
+                self.connected = True
+                if self.debug:
+                    Logger.info(f"VOIP: Connected to {self.dst_address}:{self.dst_port}")
+            except JavaException as e:
+                if self.debug:
+                    Logger.error(
+                        "VOIP: "
+                        "Ensure INTERNET and ACCESS_NETWORK_STATE permissions are in buildozer.spec "
+                        "and server is available."
+                    )
+                    Logger.error(f"VOIP: {e}")
+
+        def connect_datagram(self):
+            # UDP has no handshake, so "connected" only binds the socket to the server
+            if self.ssl:
+                if self.debug:
+                    Logger.warning("VOIP: SSL is not available over UDP, falling back to TCP")
+                return
+            try:
+                self.socket = DatagramSocket()
+                self.socket.connect(SocketTimer(self.dst_address, self.dst_port))
+                self.socket.setSoTimeout(self.timeout * 1000)
+                self.udp = True
+                self.framed = True
+                self.connected = True
+                if self.debug:
+                    Logger.info(f"VOIP: Sending UDP to {self.dst_address}:{self.dst_port}")
+            except JavaException as e:
+                if self.socket != None:
+                    self.socket.close()
+                    self.socket = None
+                if self.debug:
+                    Logger.warning("VOIP: UDP unavailable, falling back to TCP")
+                    Logger.warning(f"VOIP: {e}")
+
+        def close_connection(self):
+            # Closing the socket also wakes a stream thread blocked on it
             if self.socket != None:
                 self.socket.close()
-                self.socket = None
-            if self.debug:
-                Logger.info("VOIP: Call ended")
 
-        def verifyPermission(self):
+        def verifyPermission(self, call):
             self.hasPermission = False
-            self.audio_record = AudioRecord(
+            call.source = AudioRecord(
                 AudioSource.VOICE_COMMUNICATION,
                 self.SAMPLE_RATE,
                 self.CHANNEL_CONFIG,
                 self.AUDIO_FORMAT,
-                self.buffer_size,
+                # Room for two packets, so the next one records while one is read
+                max(self.buffer_size, 2 * self.SAMPLE_RATE * 2 * self.packet_ms // 1000),
             )
-            if self.audio_record.getState() != AudioRecord.STATE_UNINITIALIZED:
+            if call.source.getState() != AudioRecord.STATE_UNINITIALIZED:
                 self.hasPermission = True
                 if self.debug:
                     Logger.info("VOIP: Microphone permission granted")
@@ -160,39 +1106,42 @@ if platform == 'android':
                         "Ensure RECORD_AUDIO (Mic) permission is enabled in app settings"
                     )
 
-        def send_audio(self):
-            audio_data = bytearray(self.buffer_size)
-            self.audio_record.startRecording()
-            if self.debug:
-                Logger.info("VOIP: Microphone live stream started")
-            while self.active_call == True:
+        def capture_audio(self, call, ring):
+            # Only reads the microphone, so a slow network write never delays
+            # AudioRecord.read and overruns its buffer
+            audio_record = call.source
+            audio_record.startRecording()
+            while call.active:
+                slot = ring.acquire()
                 try:
-                    bytes_read = self.audio_record.read(
-                        audio_data, 0, self.buffer_size
+                    bytes_read = audio_record.read(
+                        ring.buffers[slot], ring.headroom, ring.slot_size
                     )
-                    if (
-                        bytes_read != AudioRecord.ERROR_INVALID_OPERATION
-                        and bytes_read != AudioRecord.ERROR_BAD_VALUE
-                    ):
-                        self.data_output_stream.write(audio_data, 0, bytes_read)
-                    elif bytes_read == AudioRecord.ERROR_INVALID_OPERATION:
-                        if self.debug:
-                            Logger.warning("VOIP: ERROR_INVALID_OPERATION on microphone")
-                    else:
-                        if self.debug:
-                            Logger.warning("VOIP: ERROR_BAD_VALUE on microphone")
                 except JavaException as e:
-                    self.active_call = False
+                    ring.cancel(slot)
+                    call.active = False
+                    call.failed = True
                     if self.debug:
                         Logger.error("VOIP: Microphone Stream Error")
                         Logger.error(f"VOIP: {e}")
+                    break
+                if bytes_read > 0:
+                    ring.commit(slot, bytes_read, voip_protocol.timestamp_ms())
+                    continue
+                ring.cancel(slot)
+                if bytes_read == AudioRecord.ERROR_INVALID_OPERATION:
+                    call.stats.mic_invalid_operation += 1
+                    if self.debug:
+                        Logger.warning("VOIP: ERROR_INVALID_OPERATION on microphone")
+                else:
+                    call.stats.mic_bad_value += 1
+                    if self.debug:
+                        Logger.warning("VOIP: ERROR_BAD_VALUE on microphone")
+            audio_record.stop()
 
-            self.audio_record.stop()
-            if self.debug:
-                Logger.info("VOIP: Microphone live stream ended")
-        
-        def receive_audio(self):
-            audio_track = AudioTrack(
+        def open_speaker(self, call):
+            # Every call has its own AudioTrack, which Android mixes
+            call.sink = AudioTrack(
                 AudioManager.STREAM_VOICE_CALL,
                 self.SAMPLE_RATE,
                 AudioFormat.CHANNEL_OUT_MONO,
@@ -200,63 +1149,130 @@ if platform == 'android':
                 self.buffer_size,
                 AudioTrack.MODE_STREAM,
             )
-            buffer = bytearray(self.buffer_size)
-            audio_track.play()
+            self.prepare_playout(call)
+            call.sink.play()
+            if call.jitter is not None:
+                call.playout_thread = threading.Thread(
+                    target=self.play_audio, args=(call,), daemon=True
+                )
+                call.playout_thread.start()
+
+        def close_speaker(self, call):
+            call.sink.stop()
+
+        def receive_audio(self):
+            # Reads the connection for all of its calls, see CallEvents.deliver
+            buffer = bytearray(RECEIVE_BUFFER_SIZE)
+            decoder = voip_protocol.FrameDecoder() if self.framed else None
+            if self.udp:
+                packet = DatagramPacket(bytearray(DATAGRAM_BUFFER_SIZE), DATAGRAM_BUFFER_SIZE)
             if self.debug:
                 Logger.info("VOIP: Speaker live stream started")
-            try:
-                while self.active_call == True:
-                    bytes_received = self.data_input_stream.read(buffer)
-                    if bytes_received > 0:
-                        audio_track.write(buffer, 0, bytes_received)
-            except JavaException as e:
-                self.active_call = False
-                if self.debug:
-                    Logger.error("VOIP: Speaker Stream Error")
-                    Logger.error(f"VOIP: {e}")
-
-            audio_track.stop()
+            while self.reading():
+                generation = self.generation
+                try:
+                    started = time.perf_counter()
+                    if self.udp:
+                        self.socket.receive(packet)
+                        seconds = time.perf_counter() - started
+                        try:
+                            frames = [voip_protocol.decode_frame(
+                                bytes(packet.getData())[:packet.getLength()]
+                            )]
+                        except voip_protocol.ProtocolError:
+                            continue
+                    else:
+                        bytes_received = self.data_input_stream.read(buffer)
+                        if bytes_received < 0:
+                            raise EOFError("Server closed the connection")
+                        if bytes_received == 0:
+                            continue
+                        seconds = time.perf_counter() - started
+                        if decoder is None:
+                            call = self.calls_by_channel.get(0)
+                            if call is not None:
+                                self.audio_received = True
+                                call.stats.received(bytes_received, seconds)
+                                call.stats.frames_received += 1
+                                self.play(call, bytes(buffer[:bytes_received]))
+                            continue
+                        frames = decoder.feed(memoryview(buffer)[:bytes_received])
+                    self.deliver(frames, seconds)
+                except STREAM_ERRORS as e:
+                    if timed_out(e):
+                        continue
+                    if self.reading() and self.debug:
+                        Logger.error("VOIP: Speaker Stream Error")
+                        Logger.error(f"VOIP: {e}")
+                    if self.connection_lost(generation, e):
+                        # A partial frame or sample from the old connection must not prefix the new one
+                        decoder = voip_protocol.FrameDecoder() if self.framed else None
+                        self.raw_remainder = b""
             if self.debug:
                 Logger.info("VOIP: Speaker live stream ended")
 
+        def write_speaker(self, call, payload):
+            call.sink.write(payload, 0, len(payload))
+
+        def play_audio(self, call):
+            # AudioTrack.write blocks while the track is full, which paces this loop
+            audio_track = call.sink
+            silence = bytes(call.capture.slot_size)
+            # getUnderrunCount needs API 24
+            poll_underruns = hasattr(audio_track, "getUnderrunCount")
+            writes = 0
+            while call.active:
+                writes += 1
+                if poll_underruns and writes % UNDERRUN_POLL_WRITES == 0:
+                    call.stats.speaker_underruns = audio_track.getUnderrunCount()
+                self.write_speaker(call, self.next_playout(call, silence))
+
 elif platform == 'ios':
     from pyobjus import autoclass
     from pyobjus.dylib_manager import load_framework
-    load_framework("/System/Library/Frameworks/AVFoundation.framework")
-    load_framework("/System/Library/Frameworks/Foundation.framework")
-    load_framework("./Voip.framework")
-
-    AVAudioEngine = autoclass("AVAudioEngine")
-    AVAudioPlayerNode = autoclass("AVAudioPlayerNode")
-    AVAudioFormat = autoclass("AVAudioFormat")
-    VoipMachine = autoclass("Voip")
-    AVAudioSession = autoclass("AVAudioSession")
-    NSError = autoclass("NSError")
-
-    class Client:
-        # Variables to be configured per client
-        client_id = ""  # Used to identify/authenticate client's connection
-        dst_address = "127.0.0.1"  # Use root domain for ssl connection
-        dst_port = 8080
-        timeout = 5  # Sets WAN timeout. LAN connection max is 2 secs.
-        ssl = False
-        tls_version = ""  # Defaults to auto selection. TLSv1.3 and TLSv1.2 are options
-        debug = False
+    # Frameworks and classes, loaded by load_bindings on first use
+    AVAudioEngine = AVAudioPlayerNode = AVAudioFormat = None
+    VoipMachine = AVAudioSession = NSError = None
+    bindings_loaded = False
+
+    def load_bindings():
+        global AVAudioEngine, AVAudioPlayerNode, AVAudioFormat
+        global VoipMachine, AVAudioSession, NSError, bindings_loaded
+        with bindings_lock:
+            if bindings_loaded:
+                return
+            load_framework("/System/Library/Frameworks/AVFoundation.framework")
+            load_framework("/System/Library/Frameworks/Foundation.framework")
+            load_framework("./Voip.framework")
+            AVAudioEngine = autoclass("AVAudioEngine")
+            AVAudioPlayerNode = autoclass("AVAudioPlayerNode")
+            AVAudioFormat = autoclass("AVAudioFormat")
+            VoipMachine = autoclass("Voip")
+            AVAudioSession = autoclass("AVAudioSession")
+            NSError = autoclass("NSError")
+            bindings_loaded = True
+
+    CALL_ACTIVITY_INTERVAL = 0.25  # secs between checks of the framework's callActive flag
+
+    class Client(CallEvents):
+        # Connection variables are configured as for CallEvents
         # Variables to adjust audio format and quality. Default settings recommended for Android compatibility
         format = 3
         sample_rate = 16000.0
         channels = 1
         interleaved = False
         buffersize = 640
-        # Variables to be assigned dynamic values for VOIP services
-        input_node = None
-        hasPermission = False
-        connected = False
-        active_call = False
-        error = None
-        debug = False
 
         def __init__(self):
+            super().__init__()
+            # Variables to be assigned dynamic values for VOIP services
+            self.input_node = None
+            self.hasPermission = False
+            self.error = None
+
+        def load_engine(self):
+            # The engine, player node and Voip processor are created for the first call
+            load_bindings()
             self.audio_engine = AVAudioEngine.alloc().init()
             self.player_node = AVAudioPlayerNode.alloc().init()
             self.processor = VoipMachine.alloc().init()
@@ -275,6 +1291,9 @@ elif platform == 'ios':
                 "org.kivy.voip", -1, None
             )
 
+        def open_warm_connection(self):
+            pass  # Voip.framework connects in start_call, so only the engine is prewarmed
+
         def verify_permission(self):
             self.hasPermission = False
             self.session = AVAudioSession.sharedInstance()
@@ -324,40 +1343,71 @@ elif platform == 'ios':
                 if self.debug:
                     Logger.error(f"VOIP: Failed to configure audio session: {e}")
 
-        def start_call(self):
-            if self.debug:
-                Logger.info("VOIP: Starting call")
+        def start_call(self, client_id=None):
+            # Returns the Call. client_id defaults to Client.client_id. Voip.framework
+            # owns the connection and the audio engine, so there is one call at a time
+            call = self.new_call(client_id)
+            if self.calls_by_channel:
+                if self.debug:
+                    Logger.error("VOIP: Voip.framework runs one call at a time, end the other call first")
+                call.set_state(FAILED)
+                return call
             self.verify_permission()
-            if self.hasPermission:
+            if not self.hasPermission:
+                call.set_state(FAILED)
+            else:
                 self.connected = False
                 if self.debug:
                     Logger.info(f"VOIP: {self.timeout} sec(s) wait for connection")
+                started = time.perf_counter()
                 self.processor.connect_port_ssl_tlsVersion_timeout_(
                     self.dst_address, self.dst_port, self.ssl, self.tls_version, self.timeout
                 )
+                # Includes the TLS handshake when ssl is set, the framework does both at once
+                call.stats.connect_ms = (time.perf_counter() - started) * 1000
                 if self.processor.connected():
                     if self.debug:
                         Logger.info(f"VOIP: Connected to {self.dst_address}:{self.dst_port}")
                     self.connected = True
-                    self.active_call = True
-                    if self.client_id != "":
-                        self.processor.sendClientID_(self.client_id)
+                    call.channel = 0
+                    call.active = True
+                    with self.calls_lock:
+                        self.calls_by_channel[0] = call
+                    call.set_state(ACTIVE)
+                    call.start_reporting(self.stats_callback, self.stats_interval)
+                    if call.client_id != "":
+                        self.processor.sendClientID_(call.client_id)
                     self.configure_audio_session()
                     self.start_audio_engine()
-                    threading.Thread(target=self.track_call_activity, daemon=True).start()
+                    self.call_ending.clear()
+                    call.record_thread = threading.Thread(
+                        target=self.track_call_activity, args=(call,), daemon=True
+                    )
+                    call.record_thread.start()
                 else:
+                    call.set_state(FAILED)
                     if self.debug:
                         Logger.error(
                             f"VOIP: Could not connect to {self.dst_address}:{self.dst_port}. "
                             "Ensure server is reachable."
                         )
+            return call
 
-        def track_call_activity(self):
+        def track_call_activity(self, call):
+            # Voip.framework has no completion callback, so its flag is checked
+            # at a low rate, sleeping in between. end_call wakes this at once.
+            # Whichever side hangs up, the audio engine is stopped here
             while self.processor.callActive:
-                pass
+                if self.call_ending.wait(CALL_ACTIVITY_INTERVAL):
+                    break
             if self.debug:
                 Logger.info("VOIP: Audio stream ended.")
-            self.active_call = False
+            self.stop_audio_engine()
+            call.active = False
+            with self.calls_lock:
+                if self.calls_by_channel.get(0) is call:
+                    del self.calls_by_channel[0]
+            call.finish()
 
         def start_audio_engine(self):
             self.input_node = self.audio_engine.inputNode
@@ -381,13 +1431,248 @@ elif platform == 'ios':
                 if self.debug:
                     Logger.error(f"VOIP: Failed to start audio engine: {e}")
 
-        def end_call(self):
+        def stop_audio_engine(self):
+            # Undoes start_audio_engine and closes the framework's connection, so
+            # the next call starts from a stopped engine with no tap installed
+            if not self.connected:
+                return
+            self.connected = False
+            self.input_node.removeTapOnBus_(0)
+            self.audio_engine.stop()
+            self.player_node.stop()
+            self.audio_engine.detachNode_(self.player_node)
+            self.processor.disconnect()
+
+        def end_call(self, call=None):
+            # Ends call, or the live call when None
+            if call is None:
+                call = self.calls_by_channel.get(0)
+                if call is None:
+                    return
             if self.debug:
                 Logger.info("VOIP: Ending call")
-            if self.connected:
-                self.input_node.removeTapOnBus_(0)
-                self.audio_engine.stop()
-                self.player_node.stop()
-                self.processor.disconnect()
+            if self.calls_by_channel.get(0) is call:
+                self.call_ending.set()  # track_call_activity stops the engine
+            if call.record_thread is not None and call.record_thread is not threading.current_thread():
+                call.record_thread.join()
+            call.finish()
             if self.debug:
                 Logger.info("VOIP: Call ended")
+
+else:
+    # Headless backend for Linux, macOS and Windows hosts. Keeps the Client API of
+    # the mobile backends on plain Python sockets, with voip_audio sources and
+    # sinks standing in for the microphone and speaker
+    import socket
+    import ssl as tls
+    import voip_audio
+
+    TLS_VERSIONS = {"TLSv1.2": tls.TLSVersion.TLSv1_2, "TLSv1.3": tls.TLSVersion.TLSv1_3}
+    STREAM_ERRORS = (OSError, EOFError, voip_protocol.ProtocolError)
+
+    def refused(e):
+        # A datagram reached a port without a UDP server, e.g. one running TCP only
+        return isinstance(e, ConnectionRefusedError)
+
+    class Client(CallEvents):
+        # Connection and pipeline variables are configured as for CallEvents
+        source = None  # Microphone stand-in from voip_audio. Sends silence if None. start_call can override it
+        sink = None  # Speaker stand-in from voip_audio. Discards audio if None. start_call can override it
+        hasPermission = True  # No microphone permission to ask for
+
+        def __init__(self):
+            super().__init__()
+            # Variables to be assigned dynamic values for VOIP services
+            self.tls_context = None
+            self.tls_context_version = None
+            self.tls_session = None
+
+        def write_packet(self, data, length, stats=None, frames=1):
+            started = time.perf_counter()
+            with self.write_lock:
+                if self.udp:
+                    self.socket.send(memoryview(data)[:length])
+                else:
+                    self.socket.sendall(memoryview(data)[:length])
+            if stats is not None:
+                stats.sent(length, time.perf_counter() - started, frames)
+
+        def send_client_id(self, call):
+            try:
+                client_id = self.client_id_packet(call)
+                self.write_packet(client_id, len(client_id), call.stats)
+                if self.debug:
+                    Logger.info("VOIP: Client ID sent")
+            except OSError as e:
+                if self.debug:
+                    Logger.info("VOIP: Client ID delivery failed")
+                    Logger.error(f"VOIP: {e}")
+
+        def start_call(self, client_id=None, source=None, sink=None):
+            # Returns the Call. Calls running at once each need their own source and sink
+            call = self.new_call(client_id)
+            call.source = self.source if source is None else source
+            call.sink = self.sink if sink is None else sink
+            self.place_call(call)
+            return call
+
+        def connect_stream(self):
+            try:
+                started = time.perf_counter()
+                connection = socket.create_connection(
+                    (self.dst_address, self.dst_port), self.timeout
+                )
+                self.connection_stats.connect_ms = (time.perf_counter() - started) * 1000
+                connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                if self.ssl:
+                    if self.tls_context is None or self.tls_context_version != self.tls_version:
+                        context = tls.create_default_context()
+                        if self.tls_version != "":
+                            context.minimum_version = TLS_VERSIONS[self.tls_version]
+                            context.maximum_version = TLS_VERSIONS[self.tls_version]
+                        self.tls_context = context
+                        self.tls_context_version = self.tls_version
+                        self.tls_session = None
+                    started = time.perf_counter()
+                    # Offering the last call's session lets the server skip the full handshake
+                    connection = self.tls_context.wrap_socket(
+                        connection, server_hostname=self.dst_address, session=self.tls_session
+                    )
+                    self.connection_stats.tls_handshake_ms = (time.perf_counter() - started) * 1000
+                    self.connection_stats.tls_resumed = connection.session_reused
+                connection.settimeout(self.timeout)
+                self.socket = connection
+                self.connected = True
+                if self.debug:
+                    Logger.info(f"VOIP: Connected to {self.dst_address}:{self.dst_port}")
+            except (OSError, KeyError) as e:
+                if self.debug:
+                    Logger.error("VOIP: Ensure server is available.")
+                    Logger.error(f"VOIP: {e!r}")
+
+        def connect_datagram(self):
+            # UDP has no handshake, so "connected" only binds the socket to the server
+            if self.ssl:
+                if self.debug:
+                    Logger.warning("VOIP: SSL is not available over UDP, falling back to TCP")
+                return
+            try:
+                family, kind, proto, _, address = socket.getaddrinfo(
+                    self.dst_address, self.dst_port, type=socket.SOCK_DGRAM
+                )[0]
+                connection = socket.socket(family, kind, proto)
+                connection.connect(address)
+                connection.settimeout(self.timeout)
+                self.socket = connection
+                self.udp = True
+                self.framed = True
+                self.connected = True
+                if self.debug:
+                    Logger.info(f"VOIP: Sending UDP to {self.dst_address}:{self.dst_port}")
+            except OSError as e:
+                if self.debug:
+                    Logger.warning("VOIP: UDP unavailable, falling back to TCP")
+                    Logger.warning(f"VOIP: {e}")
+
+        def close_connection(self):
+            if self.socket != None:
+                if isinstance(self.socket, tls.SSLSocket) and self.socket.session is not None:
+                    # TLS 1.3 session tickets arrive after the handshake, so the
+                    # session is saved for resumption only when the connection ends
+                    self.tls_session = self.socket.session
+                # Wakes a stream thread blocked on the socket instead of waiting out its timeout
+                try:
+                    self.socket.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                self.socket.close()
+
+        def capture_audio(self, call, ring):
+            # Paced like a microphone, which delivers one packet at a time
+            source = call.source if call.source is not None else voip_audio.SilenceSource()
+            packet_seconds = ring.slot_size / (self.SAMPLE_RATE * 2)
+            next_packet = time.monotonic()
+            while call.active:
+                next_packet += packet_seconds
+                delay = next_packet - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -5 * packet_seconds:
+                    next_packet = time.monotonic()  # Stalled, so restart the clock rather than burst
+                slot = ring.acquire()
+                pcm = source.read(ring.slot_size)
+                ring.views[slot][ring.headroom:ring.headroom + len(pcm)] = pcm
+                ring.commit(slot, len(pcm), voip_protocol.timestamp_ms())
+
+        def open_speaker(self, call):
+            if call.sink is None:
+                call.sink = voip_audio.NullSink()
+            self.prepare_playout(call)
+            if call.jitter is not None:
+                call.playout_thread = threading.Thread(
+                    target=self.play_audio, args=(call,), daemon=True
+                )
+                call.playout_thread.start()
+
+        def receive_audio(self):
+            # Reads the connection for all of its calls, see CallEvents.deliver
+            if self.udp:
+                buffer = bytearray(DATAGRAM_BUFFER_SIZE)
+            else:
+                buffer = bytearray(RECEIVE_BUFFER_SIZE)
+            view = memoryview(buffer)
+            decoder = voip_protocol.FrameDecoder() if self.framed and not self.udp else None
+            if self.debug:
+                Logger.info("VOIP: Speaker live stream started")
+            while self.reading():
+                generation = self.generation
+                try:
+                    started = time.perf_counter()
+                    bytes_received = self.socket.recv_into(buffer)
+                    if bytes_received == 0:
+                        raise EOFError("Server closed the connection")
+                    seconds = time.perf_counter() - started
+                    if self.udp:
+                        try:
+                            frames = [voip_protocol.decode_frame(view[:bytes_received])]
+                        except voip_protocol.ProtocolError:
+                            continue
+                    elif decoder is None:
+                        call = self.calls_by_channel.get(0)
+                        if call is not None:
+                            self.audio_received = True
+                            call.stats.received(bytes_received, seconds)
+                            call.stats.frames_received += 1
+                            self.play(call, bytes(view[:bytes_received]))
+                        continue
+                    else:
+                        frames = decoder.feed(view[:bytes_received])
+                    self.deliver(frames, seconds)
+                except socket.timeout:
+                    continue  # Nothing received for Client.timeout, such as before the peer joins
+                except STREAM_ERRORS as e:
+                    if self.reading() and self.debug:
+                        Logger.error("VOIP: Speaker Stream Error")
+                        Logger.error(f"VOIP: {e}")
+                    if self.connection_lost(generation, e):
+                        # A partial frame or sample from the old connection must not prefix the new one
+                        decoder = voip_protocol.FrameDecoder() if self.framed and not self.udp else None
+                        self.raw_remainder = b""
+            if self.debug:
+                Logger.info("VOIP: Speaker live stream ended")
+
+        def write_speaker(self, call, payload):
+            call.sink.write(payload)
+
+        def play_audio(self, call):
+            # Paced like a speaker, which asks for more once it has played what it has
+            bytes_per_second = self.SAMPLE_RATE * 2
+            silence = bytes(call.capture.slot_size)
+            next_frame = time.monotonic()
+            while call.active:
+                delay = next_frame - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                payload = self.next_playout(call, silence)
+                self.write_speaker(call, payload)
+                next_frame += len(payload) / bytes_per_second
@@ -0,0 +1,116 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import array
+import math
+import sys
+import threading
+import wave
+
+# Stand-ins for the microphone and speaker of the headless Client. Audio is
+# PCM 16 bit mono, little-endian, at the Client's SAMPLE_RATE. WAV files in
+# other rates or channel counts are converted on load with voip_resample,
+# which needs NumPy.
+
+
+def to_little_endian(samples):
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+class SilenceSource:
+    def read(self, size):
+        return bytes(size)
+
+
+class SineSource:
+    def __init__(self, frequency=440.0, amplitude=0.3, sample_rate=16000):
+        # One second of tone, so whole-hertz frequencies loop without a phase jump
+        samples = array.array("h", (
+            int(amplitude * 32767 * math.sin(2 * math.pi * frequency * n / sample_rate))
+            for n in range(sample_rate)
+        ))
+        self.tone = to_little_endian(samples)
+        self.position = 0
+
+    def read(self, size):
+        size -= size % 2
+        chunk = bytearray()
+        while len(chunk) < size:
+            end = min(self.position + size - len(chunk), len(self.tone))
+            chunk += self.tone[self.position:end]
+            self.position = end % len(self.tone)
+        return bytes(chunk)
+
+
+class WavSource:
+    def __init__(self, path, loop=True, sample_rate=16000):
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"{path} must be 16 bit")
+            channels = wav.getnchannels()
+            rate = wav.getframerate()
+            self.audio = wav.readframes(wav.getnframes())
+        if channels != 1 or rate != sample_rate:
+            import voip_resample
+            converter = voip_resample.FormatConverter(
+                rate, sample_rate, in_channels=channels, out_channels=1
+            )
+            self.audio = converter.convert(self.audio)
+        self.loop = loop
+        self.position = 0
+
+    def read(self, size):
+        chunk = self.audio[self.position:self.position + size]
+        self.position += len(chunk)
+        if len(chunk) < size and self.loop and self.audio:
+            self.position = 0
+            return chunk + self.read(size - len(chunk))
+        return chunk + bytes(size - len(chunk))  # Silence once a file has played
+
+
+class NullSink:
+    def __init__(self):
+        self.bytes_written = 0
+
+    def write(self, pcm):
+        self.bytes_written += len(pcm)
+
+
+class WavSink:
+    def __init__(self, path, sample_rate=16000):
+        self.lock = threading.Lock()
+        self.wav = wave.open(path, "wb")
+        self.wav.setnchannels(1)
+        self.wav.setsampwidth(2)
+        self.wav.setframerate(sample_rate)
+
+    def write(self, pcm):
+        with self.lock:
+            self.wav.writeframes(pcm)
+
+    def close(self):
+        with self.lock:
+            self.wav.close()
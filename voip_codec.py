@@ -0,0 +1,200 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import struct
+
+import numpy as np
+
+import voip_protocol
+
+# Codec names accepted by Client.codec, mapped to their frame payload types
+CODECS = {
+    "pcm": voip_protocol.PCM16,
+    "ulaw": voip_protocol.ULAW,  # G.711 mu-law, 2:1
+    "adpcm": voip_protocol.ADPCM,  # IMA ADPCM, 4:1
+}
+# REDUNDANT frames are decodable too, since their copies are ADPCM
+SUPPORTED = voip_protocol.codec_mask(CODECS.values()) | 1 << voip_protocol.REDUNDANT
+
+PCM = np.dtype("<i2")
+
+
+def _ulaw_tables():
+    # Encode table indexed by every 16 bit sample, viewed as unsigned. Follows
+    # the 14 bit reference implementation, so it matches audioop.lin2ulaw
+    samples = np.arange(65536, dtype=np.uint32).astype(np.uint16).view(np.int16).astype(np.int32)
+    samples >>= 2
+    mask = np.where(samples < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(samples), 8159) + 0x21
+    segment = np.searchsorted([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF], magnitude)
+    code = np.where(
+        segment < 8, (np.minimum(segment, 7) << 4) | ((magnitude >> (segment + 1)) & 0x0F), 0x7F
+    )
+    encode = (code ^ mask).astype(np.uint8)
+
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    magnitude = (((codes & 0x0F) << 3) + 0x84 << exponent) - 0x84
+    decode = np.where(codes & 0x80, -magnitude, magnitude).astype(PCM)
+    return encode, decode
+
+
+ULAW_ENCODE, ULAW_DECODE = _ulaw_tables()
+
+
+def ulaw_encode(pcm):
+    return ULAW_ENCODE[np.frombuffer(pcm, PCM).view(np.uint16)].tobytes()
+
+
+def ulaw_decode(data):
+    return ULAW_DECODE[np.frombuffer(data, np.uint8)].tobytes()
+
+
+ADPCM_STEPS = np.array([
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767,
+])
+ADPCM_INDEX_STEPS = np.array([-1, -1, -1, -1, 2, 4, 6, 8] * 2)
+# Each frame starts with the predictor and step index it was encoded from, so
+# frames decode on their own and a lost frame cannot desynchronise the decoder
+ADPCM_HEADER = struct.Struct("<hBB")  # predictor, step index, padded final nibble
+
+
+def _adpcm_tables():
+    # Reconstructed difference and next step index for every (step index, code)
+    step = ADPCM_STEPS[:, None]
+    codes = np.arange(16)[None, :]
+    difference = (
+        (step >> 3)
+        + np.where(codes & 4, step, 0)
+        + np.where(codes & 2, step >> 1, 0)
+        + np.where(codes & 1, step >> 2, 0)
+    )
+    difference = np.where(codes & 8, -difference, difference)
+    next_index = np.clip(np.arange(89)[:, None] + ADPCM_INDEX_STEPS[None, :], 0, 88)
+    # The recurrence runs one sample at a time, where plain lists index fastest
+    return difference.tolist(), next_index.tolist()
+
+
+ADPCM_DIFFERENCE, ADPCM_NEXT_INDEX = _adpcm_tables()
+ADPCM_STEP_LIST = ADPCM_STEPS.tolist()
+
+
+class AdpcmEncoder:
+    def __init__(self):
+        self.predictor = 0
+        self.index = 0
+
+    def encode(self, pcm):
+        samples = np.frombuffer(pcm, PCM).tolist()
+        header = ADPCM_HEADER.pack(self.predictor, self.index, len(samples) % 2)
+        predictor = self.predictor
+        index = self.index
+        codes = []
+        for sample in samples:
+            delta = sample - predictor
+            code = 0
+            if delta < 0:
+                code = 8
+                delta = -delta
+            quantized = (delta << 2) // ADPCM_STEP_LIST[index]
+            code |= quantized if quantized < 7 else 7
+            predictor += ADPCM_DIFFERENCE[index][code]
+            if predictor > 32767:
+                predictor = 32767
+            elif predictor < -32768:
+                predictor = -32768
+            index = ADPCM_NEXT_INDEX[index][code]
+            codes.append(code)
+        self.predictor = predictor
+        self.index = index
+        if len(codes) % 2:
+            codes.append(0)
+        codes = np.array(codes, np.uint8)
+        return header + (codes[0::2] | (codes[1::2] << 4)).tobytes()
+
+
+def adpcm_decode(data):
+    # Payloads come from the peer, so a malformed one is a ProtocolError like a bad frame
+    if len(data) < ADPCM_HEADER.size:
+        raise voip_protocol.ProtocolError(f"ADPCM payload of {len(data)} bytes has no header")
+    predictor, index, padded = ADPCM_HEADER.unpack_from(data)
+    if index >= len(ADPCM_STEP_LIST):
+        raise voip_protocol.ProtocolError(f"ADPCM step index {index} out of range")
+    packed = np.frombuffer(data, np.uint8, offset=ADPCM_HEADER.size)
+    codes = np.empty(2 * len(packed), np.uint8)
+    codes[0::2] = packed & 0x0F
+    codes[1::2] = packed >> 4
+    if padded:
+        codes = codes[:-1]
+    samples = []
+    for code in codes.tolist():
+        predictor += ADPCM_DIFFERENCE[index][code]
+        if predictor > 32767:
+            predictor = 32767
+        elif predictor < -32768:
+            predictor = -32768
+        index = ADPCM_NEXT_INDEX[index][code]
+        samples.append(predictor)
+    return np.array(samples, PCM).tobytes()
+
+
+def encoded_size(payload_type, pcm_size):
+    samples = pcm_size // 2
+    if payload_type == voip_protocol.ULAW:
+        return samples
+    if payload_type == voip_protocol.ADPCM:
+        return ADPCM_HEADER.size + (samples + 1) // 2
+    return pcm_size
+
+
+class Encoder:
+    # Per call, since ADPCM carries its predictor from one frame to the next
+    def __init__(self, codec="pcm"):
+        if codec not in CODECS:
+            raise ValueError(f"codec must be one of {tuple(CODECS)}")
+        self.payload_type = CODECS[codec]
+        self.adpcm = AdpcmEncoder() if codec == "adpcm" else None
+
+    def encode(self, pcm):
+        if self.payload_type == voip_protocol.ULAW:
+            return ulaw_encode(pcm)
+        if self.payload_type == voip_protocol.ADPCM:
+            return self.adpcm.encode(pcm)
+        return pcm
+
+
+def decode(payload_type, data):
+    if payload_type == voip_protocol.ULAW:
+        return ulaw_decode(data)
+    if payload_type == voip_protocol.ADPCM:
+        return adpcm_decode(data)
+    if payload_type == voip_protocol.PCM16:
+        return data
+    raise voip_protocol.ProtocolError(f"unknown audio payload type {payload_type}")
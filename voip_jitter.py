@@ -0,0 +1,203 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import threading
+import time
+
+import voip_protocol
+
+
+class JitterBuffer:
+    """Reorders received frames and releases them at a steady pace.
+
+    put() is called from the network thread and get() from the playout thread,
+    which calls it once per frame. When get() returns None, gap tells whether
+    a frame is missing, to be concealed, or whether silence is expected. The
+    target delay follows the RFC 3550 interarrival jitter estimate, so it grows
+    on a bursty network and shrinks back once arrivals are regular again.
+    Frames without a sequence number or timestamp (raw PCM) are numbered in
+    arrival order and timed by their duration.
+    """
+
+    def __init__(
+        self,
+        sample_rate=16000,
+        sample_width=2,
+        channels=1,
+        frame_ms=20,
+        min_delay_ms=20,
+        max_delay_ms=300,
+        clock=time.monotonic,
+    ):
+        self.bytes_per_ms = sample_rate * sample_width * channels / 1000
+        self.frame_ms = frame_ms
+        self.min_delay_ms = min_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.frames = {}  # sequence -> (payload, capture timestamp or None for raw PCM)
+        self.next_sequence = None  # Next frame to play
+        self.put_sequence = 0  # Assigned to frames that arrive without a sequence
+        self.media_time = 0.0  # Assigned to frames that arrive without a timestamp
+        self.played_timestamp = None  # Capture timestamp of the payload get() last returned
+        self.last_transit = None
+        self.playing = False
+        self.silent = False  # The sender is suppressing silence, so running dry is expected
+        self.rebuffering = False  # Ran dry while audio was expected
+        self.gap = False  # get() returned None for missing audio rather than silence
+        self.depth_ms = 0.0
+        self.jitter_ms = 0.0
+        self.target_delay_ms = min_delay_ms
+        # Counters
+        self.received = 0
+        self.played = 0
+        self.underruns = 0
+        self.lost = 0
+        self.late = 0
+        self.dropped = 0
+        self.recovered = 0
+
+    def put(self, payload, sequence=None, timestamp=None, arrival=None):
+        arrival_ms = (self.clock() if arrival is None else arrival) * 1000
+        duration = len(payload) / self.bytes_per_ms
+        with self.lock:
+            if sequence is None:
+                sequence = self.put_sequence
+                self.put_sequence = (self.put_sequence + 1) & 0xFFFFFFFF
+            captured = timestamp
+            if timestamp is None:
+                timestamp = self.media_time
+                self.media_time += duration
+            self.update_jitter(arrival_ms - timestamp)
+            if self.next_sequence is None:
+                self.next_sequence = sequence
+            elif voip_protocol.sequence_delta(sequence, self.next_sequence) < 0:
+                if self.playing:
+                    self.late += 1
+                    return
+                self.next_sequence = sequence  # Reordered before playback started
+            if sequence in self.frames:
+                return
+            self.silent = False
+            self.frames[sequence] = (payload, captured)
+            self.depth_ms += duration
+            self.received += 1
+            if self.depth_ms > 2 * self.max_delay_ms:
+                self.drop_to(self.target_delay_ms)
+
+    def recover(self, payload, sequence, timestamp=None):
+        # A redundant copy of a frame, kept only if the frame itself is missing
+        with self.lock:
+            if (
+                self.next_sequence is None
+                or sequence in self.frames
+                or voip_protocol.sequence_delta(sequence, self.next_sequence) < 0
+            ):
+                return False
+            self.frames[sequence] = (payload, timestamp)
+            self.depth_ms += len(payload) / self.bytes_per_ms
+            self.recovered += 1
+            return True
+
+    def update_jitter(self, transit):
+        if self.last_transit is not None:
+            difference = abs(transit - self.last_transit)
+            if difference < 60000:  # Ignores timestamp wraparound
+                self.jitter_ms += (difference - self.jitter_ms) / 16
+        self.last_transit = transit
+        self.target_delay_ms = min(
+            max(self.frame_ms + 4 * self.jitter_ms, self.min_delay_ms), self.max_delay_ms
+        )
+
+    def get(self):
+        with self.lock:
+            self.gap = False
+            if not self.playing:
+                if not self.frames or self.depth_ms < self.target_delay_ms:
+                    self.gap = self.rebuffering
+                    return None
+                self.playing = True
+                self.rebuffering = False
+            if not self.frames:
+                # Rebuffer up to the target delay before playing again
+                if not self.silent:
+                    self.underruns += 1
+                    self.rebuffering = self.gap = True
+                self.playing = False
+                return None
+            payload = self.pop_next()
+            if payload is None:
+                if self.depth_ms <= self.target_delay_ms:
+                    self.gap = True
+                    return None  # The missing frame's slot is concealed or plays as silence
+                # Already behind, so skip the gap instead of waiting through it
+                earliest = min(
+                    self.frames,
+                    key=lambda s: voip_protocol.sequence_delta(s, self.next_sequence),
+                )
+                self.lost += voip_protocol.sequence_delta(earliest, self.next_sequence)
+                self.next_sequence = earliest
+                payload = self.pop_next()
+            self.played += 1
+            # Catch up once more than a frame above the target, counting the frame
+            # that arrives before the next get(). A looser margin left the delay a
+            # jittery spell built up in place after the network calmed down
+            if self.depth_ms > self.target_delay_ms:
+                self.drop_to(self.target_delay_ms)
+            return payload
+
+    def mark_silence(self):
+        with self.lock:
+            self.silent = True
+            self.rebuffering = False
+
+    def pop_next(self):
+        frame = self.frames.pop(self.next_sequence, None)
+        self.next_sequence = (self.next_sequence + 1) & 0xFFFFFFFF
+        if frame is None:
+            self.lost += 1
+            return None
+        payload, self.played_timestamp = frame
+        self.depth_ms -= len(payload) / self.bytes_per_ms
+        return payload
+
+    def drop_to(self, delay_ms):
+        while self.frames and self.depth_ms > delay_ms:
+            if self.pop_next() is not None:
+                self.dropped += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "depth_ms": self.depth_ms,
+                "target_delay_ms": self.target_delay_ms,
+                "jitter_ms": self.jitter_ms,
+                "received": self.received,
+                "played": self.played,
+                "underruns": self.underruns,
+                "lost": self.lost,
+                "late": self.late,
+                "dropped": self.dropped,
+                "recovered": self.recovered,
+            }
@@ -0,0 +1,62 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import numpy as np
+
+PCM = np.dtype("<i2")  # Wire format, 16 bit little endian
+
+
+class Mixer:
+    """Mix-minus for a conference room.
+
+    Every participant hears everyone but themselves. Rather than summing
+    N - 1 inputs for each of N participants, the room is summed once and each
+    participant's own input is subtracted from the total, so a tick costs
+    O(N) and the cost per participant stays flat as the room grows. Sums are
+    kept in 32 bits and clipped back to 16, so loud rooms saturate instead of
+    wrapping around. Buffers are allocated for max_participants up front.
+    """
+
+    def __init__(self, samples, max_participants=64):
+        self.samples = samples
+        self.inputs = np.zeros((max_participants, samples), dtype=PCM)
+        self.total = np.zeros(samples, dtype=np.int32)
+        self.work = np.zeros((max_participants, samples), dtype=np.int32)
+        self.outputs = np.zeros((max_participants, samples), dtype=PCM)
+
+    def load(self, row, pcm):
+        self.inputs[row] = np.frombuffer(pcm, dtype=PCM, count=self.samples)
+
+    def silence(self, row):
+        self.inputs[row] = 0
+
+    def mix(self, count):
+        # Mixes inputs[:count], which the caller fills, into outputs[:count]
+        inputs = self.inputs[:count]
+        work = self.work[:count]
+        np.sum(inputs, axis=0, dtype=np.int32, out=self.total)
+        np.subtract(self.total, inputs, out=work)
+        np.clip(work, -32768, 32767, out=work)
+        np.copyto(self.outputs[:count], work, casting="unsafe")
+        return self.outputs[:count]
@@ -0,0 +1,139 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import collections
+
+import numpy as np
+
+import voip_codec
+import voip_protocol
+
+PCM = np.dtype("<i2")
+MODES = ("fade", "pitch")
+MIN_PITCH_HZ = 60
+MAX_PITCH_HZ = 400
+
+
+class Concealer:
+    """Fills in audio for frames that were lost on the way.
+
+    "fade" repeats the last frame played, "pitch" repeats its last pitch
+    period, which keeps a voice going without the buzz of a repeated frame
+    (waveform substitution, as in G.711 Appendix I). Either way the gain
+    falls to nothing over fade_ms, after which conceal() returns None and
+    the caller plays silence. The first frame after a loss is cross-faded
+    from the substitute so that the join does not click. A repeated frame
+    rarely ends in phase with its start, so "fade" is cheaper but scores
+    below "pitch" (and silence) in bench_loss.py.
+    """
+
+    def __init__(self, sample_rate=16000, mode="pitch", fade_ms=60, overlap_ms=2.5):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        self.mode = mode
+        self.fade = int(sample_rate * fade_ms / 1000)
+        self.overlap = int(sample_rate * overlap_ms / 1000)
+        self.min_lag = sample_rate // MAX_PITCH_HZ
+        self.max_lag = sample_rate // MIN_PITCH_HZ
+        self.history = np.zeros(2 * self.max_lag, dtype=np.float32)
+        self.last_frame = None
+        self.cycle = None  # Waveform repeated while concealing
+        self.position = 0  # Samples concealed since the loss started
+        self.concealed = 0
+
+    def played(self, pcm):
+        # Called with every frame received, returns the frame to play
+        samples = np.frombuffer(pcm, PCM).astype(np.float32)
+        if self.position:
+            count = min(self.overlap, len(samples))
+            if count:
+                ramp = (np.arange(count, dtype=np.float32) + 1) / (count + 1)
+                tail = self.substitute(self.position, count)
+                samples[:count] = samples[:count] * ramp + tail * (1 - ramp)
+                pcm = samples.astype(PCM).tobytes()
+            self.position = 0
+            self.cycle = None
+        self.last_frame = samples
+        if len(samples) >= len(self.history):
+            self.history[:] = samples[-len(self.history):]
+        elif len(samples):
+            self.history[:-len(samples)] = self.history[len(samples):]
+            self.history[-len(samples):] = samples
+        return pcm
+
+    def conceal(self, size):
+        if self.last_frame is None or not len(self.last_frame) or self.position >= self.fade:
+            return None
+        if self.cycle is None:
+            self.cycle = self.last_frame
+            if self.mode == "pitch":
+                self.cycle = self.history[-self.pitch_period():]
+        samples = self.substitute(self.position, size // 2)
+        self.position += len(samples)
+        self.concealed += 1
+        return samples.astype(PCM).tobytes()
+
+    def substitute(self, start, count):
+        positions = np.arange(start, start + count)
+        gain = np.maximum(1 - positions / self.fade, 0)
+        return self.cycle[positions % len(self.cycle)] * gain
+
+    def pitch_period(self):
+        # Lag with the highest normalized autocorrelation over the last max_lag samples
+        window = self.max_lag
+        target = self.history[-window:]
+        lags = np.arange(self.min_lag, self.max_lag + 1)
+        segments = np.lib.stride_tricks.sliding_window_view(self.history, window)
+        candidates = segments[len(self.history) - window - lags]
+        squares = np.concatenate(([0.0], np.cumsum(self.history.astype(np.float64) ** 2)))
+        starts = len(self.history) - window - lags
+        energy = squares[starts + window] - squares[starts]
+        correlation = candidates @ target / np.sqrt(energy * np.dot(target, target) + 1e-9)
+        return int(lags[np.argmax(correlation)])
+
+
+class FecEncoder:
+    """Builds REDUNDANT frames for forward error correction.
+
+    Each audio frame carries ADPCM copies of the `copies` frames before it,
+    so the receiver can rebuild up to that many frames lost in a row from
+    whichever packet does arrive, with no retransmission delay. ADPCM is a
+    quarter of the size of PCM, so one copy adds about 25% to a PCM call.
+    """
+
+    def __init__(self, copies=1):
+        self.adpcm = voip_codec.AdpcmEncoder()
+        self.history = collections.deque(maxlen=copies)  # (sequence, timestamp, ADPCM payload)
+
+    def encode(self, payload_type, payload, pcm, sequence, timestamp):
+        blocks = []
+        for copy_sequence, copy_timestamp, data in self.history:
+            distance = (sequence - copy_sequence) & 0xFFFFFFFF
+            offset = (timestamp - copy_timestamp) & 0xFFFFFFFF
+            if distance <= 0xFF and offset <= 0xFFFF:
+                blocks.append((voip_protocol.ADPCM, distance, offset, data))
+        frame = voip_protocol.encode_redundant(payload_type, payload, blocks, sequence, timestamp)
+        copy = payload if payload_type == voip_protocol.ADPCM else self.adpcm.encode(pcm)
+        self.history.append((sequence, timestamp, bytes(copy)))
+        return frame
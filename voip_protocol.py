@@ -0,0 +1,208 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import collections
+import struct
+import time
+
+# Framed streams start every frame with this header. Raw PCM remains the
+# default wire format, so a stream is only parsed as frames when its first
+# bytes carry MAGIC and VERSION.
+MAGIC = 0x56  # "V"
+VERSION = 1
+HEADER = struct.Struct("!BBBBHII")  # magic, version, type, flags, length, sequence, timestamp
+HEADER_SIZE = HEADER.size
+MAX_PAYLOAD = 0xFFFF
+MAX_DATAGRAM_PAYLOAD = 1280  # Keeps UDP datagrams under a typical path MTU
+DEFAULT_SAMPLE_RATE = 16000  # Of audio from senders that do not announce one, such as raw streams
+
+# Payload types
+HELLO = 0  # client_id. flags carry the codec_mask of payload types the sender can decode and
+# sequence its sample rate in Hz, 0 meaning DEFAULT_SAMPLE_RATE. Audio is mono in any payload type
+PCM16 = 1
+ULAW = 2
+ADPCM = 3
+COMFORT_NOISE = 4  # Sent instead of audio during silence, payload is the noise level
+PING = 5  # Answered by the peer with a PONG carrying the same timestamp
+PONG = 6
+REDUNDANT = 7  # Audio followed by lower bitrate copies of earlier frames. flags hold the audio's payload type
+MUX = 8  # A whole frame of the call on channel flags, when calls share a connection. Empty ends that call
+
+AUDIO_TYPES = frozenset((PCM16, ULAW, ADPCM))
+
+Frame = collections.namedtuple("Frame", "type flags sequence timestamp payload")
+# Precedes each copy in a REDUNDANT payload: payload type, sequence numbers
+# back, timestamp offset and length, after RFC 2198
+REDUNDANT_BLOCK = struct.Struct("!BBHH")
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def timestamp_ms():
+    # Capture clock in milliseconds, wrapping at 32 bits like the header field
+    return int(time.monotonic() * 1000) & 0xFFFFFFFF
+
+
+def codec_mask(payload_types):
+    mask = 1 << PCM16  # Every peer can play PCM
+    for payload_type in payload_types:
+        mask |= 1 << payload_type
+    return mask
+
+
+def is_framed(data):
+    return len(data) >= 2 and data[0] == MAGIC and data[1] == VERSION
+
+
+def sequence_delta(sequence, reference):
+    # Signed distance between two wrapping 32 bit sequence numbers
+    return (sequence - reference + 0x80000000) % 0x100000000 - 0x80000000
+
+
+def pack_header(buffer, offset, payload_type, length, sequence, timestamp, flags=0):
+    HEADER.pack_into(
+        buffer, offset, MAGIC, VERSION, payload_type, flags, length,
+        sequence & 0xFFFFFFFF, timestamp & 0xFFFFFFFF,
+    )
+
+
+def encode_frame(payload_type, payload, sequence, timestamp=None, flags=0):
+    if len(payload) > MAX_PAYLOAD:
+        raise ProtocolError(f"payload of {len(payload)} bytes exceeds {MAX_PAYLOAD}")
+    if timestamp is None:
+        timestamp = timestamp_ms()
+    frame = bytearray(HEADER_SIZE + len(payload))
+    pack_header(frame, 0, payload_type, len(payload), sequence, timestamp, flags)
+    frame[HEADER_SIZE:] = payload
+    return frame
+
+
+def parse_header(buffer, offset):
+    magic, version, payload_type, flags, length, sequence, timestamp = HEADER.unpack_from(
+        buffer, offset
+    )
+    if magic != MAGIC or version != VERSION:
+        raise ProtocolError(f"bad frame header (magic {magic:#x}, version {version})")
+    return payload_type, flags, length, sequence, timestamp
+
+
+def decode_frame(data):
+    # Parses a buffer holding exactly one frame, such as a UDP datagram
+    view = memoryview(data)
+    if len(view) < HEADER_SIZE:
+        raise ProtocolError(f"frame of {len(view)} bytes is shorter than its header")
+    payload_type, flags, length, sequence, timestamp = parse_header(view, 0)
+    if len(view) != HEADER_SIZE + length:
+        raise ProtocolError(f"frame length {length} does not match {len(view) - HEADER_SIZE} byte payload")
+    return Frame(payload_type, flags, sequence, timestamp, view[HEADER_SIZE:])
+
+
+def encode_mux(channel, frame):
+    # Channel 0 is the connection's own call, which sends plain frames and only
+    # uses MUX to end itself while later calls go on
+    return encode_frame(MUX, frame, 0, 0, channel)
+
+
+def encode_redundant(payload_type, payload, blocks, sequence, timestamp):
+    # blocks are (payload type, sequence numbers back, timestamp offset, data).
+    # The payload is a block count, the blocks, then the frame's own audio
+    parts = [bytes((len(blocks),))]
+    for block_type, distance, offset, data in blocks:
+        parts.append(REDUNDANT_BLOCK.pack(block_type, distance, offset, len(data)))
+        parts.append(data)
+    parts.append(payload)
+    return encode_frame(REDUNDANT, b"".join(parts), sequence, timestamp, payload_type)
+
+
+def split_redundant(frame):
+    # Returns the frame's own audio and the copies it carries, as Frames
+    view = memoryview(frame.payload)
+    if not len(view):
+        raise ProtocolError("empty redundant payload")
+    copies = []
+    offset = 1
+    for _ in range(view[0]):
+        if offset + REDUNDANT_BLOCK.size > len(view):
+            raise ProtocolError("truncated redundant block header")
+        block_type, distance, timestamp_offset, length = REDUNDANT_BLOCK.unpack_from(view, offset)
+        offset += REDUNDANT_BLOCK.size
+        if offset + length > len(view):
+            raise ProtocolError("truncated redundant block")
+        copies.append(Frame(
+            block_type, 0, (frame.sequence - distance) & 0xFFFFFFFF,
+            (frame.timestamp - timestamp_offset) & 0xFFFFFFFF, view[offset:offset + length],
+        ))
+        offset += length
+    return Frame(frame.flags, 0, frame.sequence, frame.timestamp, view[offset:]), copies
+
+
+class FrameDecoder:
+    """Splits a byte stream into frames.
+
+    Payloads are memoryviews into the buffer passed to feed() and are only
+    valid until the caller reuses that buffer. Only a frame split across two
+    reads is copied.
+    """
+
+    def __init__(self):
+        self.pending = bytearray()
+
+    def feed(self, data):
+        frames = []
+        view = memoryview(data)
+        if self.pending:
+            view = self.complete_pending(view, frames)
+        offset = 0
+        size = len(view)
+        while size - offset >= HEADER_SIZE:
+            payload_type, flags, length, sequence, timestamp = parse_header(view, offset)
+            end = offset + HEADER_SIZE + length
+            if end > size:
+                break
+            frames.append(
+                Frame(payload_type, flags, sequence, timestamp, view[offset + HEADER_SIZE:end])
+            )
+            offset = end
+        if offset < size:
+            self.pending += view[offset:]
+        return frames
+
+    def complete_pending(self, view, frames):
+        if len(self.pending) < HEADER_SIZE:
+            needed = HEADER_SIZE - len(self.pending)
+            self.pending += view[:needed]
+            view = view[needed:]
+            if len(self.pending) < HEADER_SIZE:
+                return view
+        payload_type, flags, length, sequence, timestamp = parse_header(self.pending, 0)
+        needed = HEADER_SIZE + length - len(self.pending)
+        self.pending += view[:needed]
+        view = view[needed:]
+        if len(self.pending) == HEADER_SIZE + length:
+            frame = memoryview(bytes(self.pending))
+            self.pending.clear()
+            frames.append(Frame(payload_type, flags, sequence, timestamp, frame[HEADER_SIZE:]))
+        return view
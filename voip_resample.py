@@ -0,0 +1,179 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import functools
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+# Sample formats, both little endian as they come off the wire or a WAV file
+FORMATS = {"int16": np.dtype("<i2"), "float32": np.dtype("<f4")}
+ZERO_CROSSINGS = 8  # Per side of the filter. More is sharper and costs more
+ROLLOFF = 0.92  # Cutoff as a share of the lower Nyquist frequency
+KAISER_BETA = 8.6
+
+
+@functools.lru_cache(maxsize=None)
+def filter_bank(up, down, zero_crossings=ZERO_CROSSINGS):
+    """Polyphase windowed-sinc filter for resampling by up / down.
+
+    The low-pass filter runs at the upsampled rate, so it is split into
+    `up` phases of `taps` coefficients and each output sample only touches
+    the phase it lands on. Rows are stored reversed so that they line up
+    with a window of input samples read forwards. Banks are shared by every
+    Resampler with the same ratio.
+    """
+    scale = max(up, down)
+    taps = int(math.ceil(2 * zero_crossings * scale / up))
+    length = taps * up
+    cutoff = ROLLOFF * 0.5 / scale
+    t = np.arange(length) - (length - 1) / 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(length, KAISER_BETA) * up
+    bank = np.ascontiguousarray(h.reshape(taps, up).T[:, ::-1], dtype=np.float32)
+    bank.setflags(write=False)
+    return bank
+
+
+class Resampler:
+    """Streaming sample rate conversion.
+
+    Takes float32 blocks shaped (samples, channels) of any length and
+    returns whatever output they complete. The tail of each block and the
+    filter phase are carried over, so frames can be fed one at a time
+    without clicks at the boundaries. Output lags the input by half the
+    filter length.
+
+    Outputs that share a phase read inputs `down` samples apart, so when
+    there are only a few phases each one is a strided view of the block
+    multiplied by a single row of the bank. Ratios with many phases, such
+    as 44.1 to 16 kHz, gather their windows instead.
+    """
+
+    def __init__(self, in_rate, out_rate, channels=1):
+        divisor = math.gcd(in_rate, out_rate)
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.channels = channels
+        self.bank = filter_bank(self.up, self.down)
+        self.taps = self.bank.shape[1]
+        self.window = np.arange(self.taps)
+        self.reset()
+
+    def reset(self):
+        self.history = np.zeros((self.taps - 1, self.channels), dtype=np.float32)
+        self.offset = 0  # Next output, in upsampled samples from the block start
+
+    def process(self, samples):
+        if self.up == self.down:
+            return samples
+        count = len(samples)
+        outputs = -(-(count * self.up - self.offset) // self.down)
+        if outputs <= 0:
+            self.offset -= count * self.up
+            self.history = np.concatenate((self.history, samples))[count:]
+            return np.zeros((0, self.channels), dtype=np.float32)
+        padded = np.concatenate((self.history, samples))
+        if outputs >= 4 * self.up:
+            resampled = self.by_phase(padded, outputs)
+        else:
+            position = self.offset + self.down * np.arange(outputs)
+            start, phase = np.divmod(position, self.up)
+            windows = padded[start[:, None] + self.window]
+            resampled = np.einsum("kt,ktc->kc", self.bank[phase], windows)
+        self.offset += outputs * self.down - count * self.up
+        self.history = padded[count:]
+        return resampled
+
+    def by_phase(self, padded, outputs):
+        resampled = np.empty((outputs, self.channels), dtype=np.float32)
+        step, item = padded.strides
+        for first in range(self.up):
+            start, phase = divmod(self.offset + self.down * first, self.up)
+            count = len(range(first, outputs, self.up))
+            windows = as_strided(
+                padded[start:], (count, self.channels, self.taps),
+                (step * self.down, item, step), writeable=False,
+            )
+            resampled[first::self.up] = windows.dot(self.bank[phase])
+        return resampled
+
+
+def decode(data, sample_format="int16", channels=1):
+    # Bytes to float32 samples in [-1, 1), shaped (samples, channels)
+    samples = np.frombuffer(data, dtype=FORMATS[sample_format])
+    samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+    if sample_format == "int16":
+        return samples.astype(np.float32) / 32768
+    return samples.astype(np.float32)
+
+
+def encode(samples, sample_format="int16"):
+    if sample_format == "int16":
+        scaled = np.rint(samples * 32768)
+        return np.clip(scaled, -32768, 32767).astype(FORMATS["int16"]).tobytes()
+    return samples.astype(FORMATS[sample_format]).tobytes()
+
+
+def remix(samples, channels):
+    # Down to mono by averaging, up from mono by copying
+    if samples.shape[1] == channels:
+        return samples
+    if channels == 1:
+        return samples.mean(axis=1, keepdims=True, dtype=np.float32)
+    if samples.shape[1] == 1:
+        return np.repeat(samples, channels, axis=1)
+    raise ValueError(f"Can not remix {samples.shape[1]} channels into {channels}")
+
+
+class FormatConverter:
+    """Converts a stream of audio bytes between rates, formats and channels.
+
+    For example the 48 kHz float audio an iOS audio unit captures into the
+    16 kHz 16 bit mono the wire carries. Channels are remixed before
+    resampling when that means fewer channels to filter.
+    """
+
+    def __init__(self, in_rate, out_rate, in_format="int16", out_format="int16",
+                 in_channels=1, out_channels=1):
+        for sample_format in (in_format, out_format):
+            if sample_format not in FORMATS:
+                raise ValueError(f"Unsupported sample format {sample_format}")
+        self.in_format = in_format
+        self.out_format = out_format
+        self.in_channels = in_channels
+        self.out_channels = out_channels
+        self.resampler = Resampler(in_rate, out_rate, min(in_channels, out_channels))
+        self.in_frame_bytes = in_channels * FORMATS[in_format].itemsize
+        self.pending = b""  # Partial sample left over from the last chunk
+
+    def convert(self, data):
+        data = self.pending + bytes(data)
+        usable = len(data) - len(data) % self.in_frame_bytes
+        self.pending = data[usable:]
+        samples = decode(data[:usable], self.in_format, self.in_channels)
+        samples = remix(samples, self.resampler.channels)
+        samples = self.resampler.process(samples)
+        samples = remix(samples, self.out_channels)
+        return encode(samples, self.out_format)
@@ -0,0 +1,127 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import collections
+import threading
+
+
+class AudioRing:
+    """Preallocated audio slots passed from a capture thread to a network thread.
+
+    The capture thread fills the slot acquire() gives it, starting at
+    headroom, and hands it over with commit(). The network thread takes
+    filled slots in capture order with take() and gives them back with
+    release(). Slots are allocated once, so nothing is allocated or copied
+    per packet. When the network falls behind and every slot is waiting,
+    acquire() recycles the oldest one: capture never blocks, and what is
+    sent is the most recent audio.
+    """
+
+    def __init__(self, slots, slot_size, headroom=0):
+        self.slot_size = slot_size
+        self.headroom = headroom  # Room in front of the audio, e.g. for a frame header
+        self.buffers = [bytearray(headroom + slot_size) for _ in range(slots + 1)]
+        self.views = [memoryview(buffer) for buffer in self.buffers]
+        self.lengths = [0] * (slots + 1)
+        self.timestamps = [None] * (slots + 1)
+        # The extra slot catches audio while the network thread holds every other one
+        self.scratch = slots
+        self.free = collections.deque(range(slots))
+        self.filled = collections.deque()
+        self.ready = threading.Condition()
+        self.closed = False
+        # Counters
+        self.captured = 0
+        self.sent = 0
+        self.overflows = 0  # Times capture found every slot full
+        self.dropped_bytes = 0  # Audio lost to overflows
+        self.max_depth = 0
+
+    def acquire(self):
+        with self.ready:
+            if self.free:
+                return self.free.popleft()
+            self.overflows += 1
+            if self.filled:
+                slot = self.filled.popleft()
+                self.dropped_bytes += self.lengths[slot]
+                return slot
+            return self.scratch
+
+    def commit(self, slot, length, timestamp=None):
+        with self.ready:
+            if slot == self.scratch:
+                self.dropped_bytes += length
+                return
+            self.lengths[slot] = length
+            self.timestamps[slot] = timestamp
+            self.filled.append(slot)
+            self.captured += 1
+            if len(self.filled) > self.max_depth:
+                self.max_depth = len(self.filled)
+            self.ready.notify()
+
+    def cancel(self, slot):
+        # Returns a slot that was acquired but not filled
+        if slot != self.scratch:
+            with self.ready:
+                self.free.appendleft(slot)
+
+    def take(self, timeout=None):
+        # Waits up to timeout for audio, then returns every filled slot in capture order
+        with self.ready:
+            if not self.filled and not self.closed:
+                self.ready.wait(timeout)
+            slots = list(self.filled)
+            self.filled.clear()
+            self.sent += len(slots)
+            return slots
+
+    def release(self, slots):
+        with self.ready:
+            self.free.extend(slots)
+
+    def discard(self, slots):
+        # Gives back taken slots without sending their audio
+        with self.ready:
+            self.sent -= len(slots)
+            self.dropped_bytes += sum(self.lengths[slot] for slot in slots)
+            self.free.extend(slots)
+
+    def close(self):
+        with self.ready:
+            self.closed = True
+            self.ready.notify_all()
+
+    def stats(self):
+        with self.ready:
+            return {
+                "slots": len(self.buffers) - 1,
+                "depth": len(self.filled),
+                "max_depth": self.max_depth,
+                "captured": self.captured,
+                "sent": self.sent,
+                "overflows": self.overflows,
+                "dropped_bytes": self.dropped_bytes,
+            }
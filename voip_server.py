@@ -0,0 +1,1129 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import abc
+import argparse
+import array
+import asyncio
+import collections
+import logging
+import multiprocessing
+import os
+import shutil
+import socket
+import struct
+import tempfile
+import time
+import zlib
+
+import voip_protocol
+
+try:
+    import voip_codec
+    import voip_mixer
+    import voip_resample
+except ImportError:  # Without NumPy, coded frames and other sample rates can only be passed through
+    voip_codec = None
+    voip_mixer = None
+    voip_resample = None
+
+logger = logging.getLogger("voip_server")
+
+# Relay mode pairs the two connections that send the same client_id.
+# Echo mode sends every stream back to its sender, like "node VOIP server.js".
+# Conference mode mixes everyone sharing a client_id, see ConferenceRoom.
+MODES = ("relay", "echo", "conference")
+TRANSPORTS = ("tcp", "udp", "both")
+MAX_CLIENT_ID = 256
+SAMPLE_WIDTH = 2  # PCM 16 bit
+SAMPLE_RATE = voip_protocol.DEFAULT_SAMPLE_RATE  # Conference audio, matching Client.SAMPLE_RATE
+MIN_SAMPLE_RATE = 8000  # Announced sample rates the server converts between
+MAX_SAMPLE_RATE = 48000
+TICK_MS = 20  # Conference mixing interval
+MAX_BACKLOG_MS = 100  # Conference audio queued per participant before the oldest is dropped
+MAX_FRAME_PAYLOAD = voip_protocol.MAX_PAYLOAD - voip_protocol.MAX_PAYLOAD % SAMPLE_WIDTH
+# Messages between workers, see Cluster
+HANDOFF = b"T"  # A TCP connection's socket and the bytes already read from it
+DATAGRAM = b"U"  # A UDP datagram and the address it came from
+CHANNEL = b"C"  # A frame of a channel proxied to the worker owning its call. Empty ends the channel
+REPLY = b"R"  # A frame for a proxied channel, back to the worker holding its connection. Empty ends it
+CHANNEL_HEADER = struct.Struct("!HIB")  # Worker holding the connection, its token, channel
+REPLY_HEADER = struct.Struct("!IB")  # Token, channel
+MAX_MESSAGE = 1 << 18  # Matches the most asyncio reads from a socket at once
+FD_SIZE = array.array("i").itemsize
+# Frames whose audio is decoded when it has to change rate or be mixed
+CONVERTED_TYPES = voip_protocol.AUDIO_TYPES | {voip_protocol.REDUNDANT}
+
+
+class Endpoint(abc.ABC):
+    # Shared by TCP connections and UDP endpoints so either can be paired with the other
+    max_payload = MAX_FRAME_PAYLOAD
+
+    def __init__(self, server):
+        self.server = server
+        self.address = None
+        self.client_id = None
+        self.peer = None
+        self.room = None
+        self.framed = None
+        self.codecs = voip_protocol.codec_mask(())  # Payload types this endpoint can decode
+        self.rate = SAMPLE_RATE  # Of the audio this endpoint sends and plays
+        self.converter = None  # Resamples this endpoint's audio for a peer at another rate
+        self.sequence = 0  # Sequence numbers for raw audio wrapped into frames
+        self.channels = {}  # channel -> ChannelEndpoint, calls multiplexed on this connection
+        self.token = None  # Names this endpoint to other workers, see Cluster.send_channel
+
+    def receive_client_id(self, data):
+        try:
+            if len(data) > MAX_CLIENT_ID:
+                raise ValueError("client_id too long")
+            client_id = bytes(data).decode().strip()
+            if client_id == "":
+                raise ValueError("empty client_id")
+        except ValueError as e:
+            logger.warning(f"Rejected {self.address}: {e}")
+            self.close()
+            return
+        self.client_id = client_id
+        self.server.join(self)
+
+    def frame_received(self, frame):
+        if frame.type == voip_protocol.MUX and self.server.mode != "echo":
+            self.mux_received(frame)
+        elif frame.type == voip_protocol.HELLO:
+            self.codecs = voip_protocol.codec_mask(()) | frame.flags
+            rate = frame.sequence or voip_protocol.DEFAULT_SAMPLE_RATE
+            if not MIN_SAMPLE_RATE <= rate <= MAX_SAMPLE_RATE:
+                logger.warning(f"Rejected {self.address}: unsupported sample rate {rate}")
+                self.close()
+                return
+            self.rate = rate
+            if self.client_id is None and self.server.mode != "echo":
+                self.receive_client_id(frame.payload)
+        elif self.room is not None:
+            self.room.frame_received(self, frame)
+        elif self.peer is not None:
+            if self.converter is not None and frame.type in CONVERTED_TYPES:
+                pcm = frame_pcm(frame)
+                if pcm is not None:
+                    self.peer.send_raw(self.converter.convert(pcm), frame.timestamp)
+            else:
+                self.peer.send_frame(frame)
+
+    def mux_received(self, frame):
+        channel = frame.flags
+        if not len(frame.payload):  # The client ended that call
+            if channel:
+                self.close_channel(channel)
+            elif self.client_id is not None:
+                self.server.leave(self)
+                self.client_id = None
+            return
+        endpoint = self.channels.get(channel)
+        if endpoint is not None and endpoint.owner is not None:
+            self.server.cluster.send_channel(endpoint, frame.payload)
+            return
+        try:
+            inner = voip_protocol.decode_frame(frame.payload)
+        except voip_protocol.ProtocolError:
+            return
+        if endpoint is None:
+            if channel == 0 or inner.type != voip_protocol.HELLO:
+                return
+            endpoint = self.open_channel(channel)
+        endpoint.frame_received(inner)
+
+    def open_channel(self, channel):
+        endpoint = self.channels[channel] = ChannelEndpoint(self, channel)
+        logger.info(f"Channel opened: {endpoint.address}")
+        return endpoint
+
+    def close_channel(self, channel):
+        endpoint = self.channels.pop(channel, None)
+        if endpoint is None:
+            return
+        if endpoint.owner is not None:
+            self.server.cluster.send_channel(endpoint, b"")
+        elif endpoint.client_id is not None:
+            self.server.leave(endpoint)
+        logger.info(f"Channel closed: {endpoint.address}")
+
+    def close_channels(self):
+        for channel in list(self.channels):
+            self.close_channel(channel)
+        if self.token is not None:
+            self.server.cluster.parents.pop(self.token, None)
+            self.token = None
+
+    def hello_frame(self):
+        # Replayed to the worker that owns the call, see Cluster
+        return voip_protocol.encode_frame(
+            voip_protocol.HELLO, self.client_id.encode(), self.rate, flags=self.codecs
+        )
+
+    def send_hello(self, codecs):
+        # Tells a framed client which codecs its peer decodes, so it can pick one
+        if self.framed:
+            self.send(voip_protocol.encode_frame(voip_protocol.HELLO, b"", 0, flags=codecs))
+
+    def send_frame(self, frame):
+        # Frames pass through untouched unless this endpoint cannot decode them
+        if frame.type == voip_protocol.REDUNDANT and not self.codecs >> frame.type & 1:
+            try:
+                frame = voip_protocol.split_redundant(frame)[0]  # Just the audio, without its FEC copies
+            except voip_protocol.ProtocolError:
+                return
+        if frame.type in voip_protocol.AUDIO_TYPES and not self.codecs >> frame.type & 1:
+            if voip_codec is None:
+                return
+            try:
+                payload = voip_codec.decode(frame.type, frame.payload)
+            except voip_protocol.ProtocolError:
+                return
+            frame = frame._replace(type=voip_protocol.PCM16, payload=payload)
+        if self.framed and len(frame.payload) > self.max_payload:
+            # A TCP peer's frames can outgrow a datagram. The FEC copies go first,
+            # then audio still too long is split as PCM, numbered like send_raw's
+            if frame.type == voip_protocol.REDUNDANT:
+                try:
+                    frame = voip_protocol.split_redundant(frame)[0]
+                except voip_protocol.ProtocolError:
+                    return
+            if len(frame.payload) > self.max_payload:
+                pcm = frame_pcm(frame)
+                if pcm is not None:
+                    self.send_raw(pcm, frame.timestamp)
+                return
+        if self.framed:
+            self.send(
+                voip_protocol.encode_frame(
+                    frame.type, frame.payload, frame.sequence, frame.timestamp, frame.flags
+                )
+            )
+        elif frame.type in voip_protocol.AUDIO_TYPES:
+            self.send(frame.payload)
+
+    def send_raw(self, data, timestamp=None):
+        # PCM at this endpoint's rate, framed and numbered here for framed endpoints
+        if not self.framed:
+            self.send(data)
+            return
+        if timestamp is None:
+            timestamp = voip_protocol.timestamp_ms()
+        bytes_per_ms = self.rate * SAMPLE_WIDTH / 1000
+        view = memoryview(data)
+        for offset in range(0, len(view), self.max_payload):
+            self.send(
+                voip_protocol.encode_frame(
+                    voip_protocol.PCM16,
+                    view[offset:offset + self.max_payload],
+                    self.sequence,
+                    timestamp + int(offset / bytes_per_ms),
+                )
+            )
+            self.sequence += 1
+
+    @abc.abstractmethod
+    def send(self, data):
+        pass
+
+    @abc.abstractmethod
+    def close(self):
+        pass
+
+
+class Connection(Endpoint, asyncio.Protocol):
+    def __init__(self, server, preamble=b""):
+        super().__init__(server)
+        self.transport = None
+        self.id_timer = None
+        self.preamble = preamble  # Bytes read by the worker that handed this connection over
+        self.handoff = None  # Bytes to hand over with this connection to the worker owning its call
+        # Framed connections are detected from their first bytes, see voip_protocol
+        self.decoder = None
+        self.remainder = b""  # Odd byte of a raw read, keeps PCM samples aligned
+        # Audio waiting for the transport to drain. Bounded by server.max_queue_bytes
+        self.queue = collections.deque()
+        self.queued_bytes = 0
+        self.paused = False
+        self.dropped_bytes = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.address = transport.get_extra_info("peername")
+        transport.set_write_buffer_limits(high=self.server.write_buffer_bytes)
+        self.server.connections.add(self)
+        logger.info(f"Client connected: {self.address}")
+        if self.server.mode == "echo":
+            self.peer = self
+        else:
+            self.id_timer = asyncio.get_running_loop().call_later(
+                self.server.id_timeout, self.id_timed_out
+            )
+        if self.preamble:
+            preamble, self.preamble = self.preamble, b""
+            self.data_received(preamble)
+
+    def data_received(self, data):
+        if self.framed is None:
+            self.framed = voip_protocol.is_framed(data)
+            if self.framed:
+                self.decoder = voip_protocol.FrameDecoder()
+        if self.framed:
+            try:
+                frames = self.decoder.feed(data)
+            except voip_protocol.ProtocolError as e:
+                logger.warning(f"Closed {self.address}: {e}")
+                self.close()
+                return
+            for frame in frames:
+                if self.handoff is None:
+                    self.frame_received(frame)
+                else:
+                    self.handoff += voip_protocol.encode_frame(
+                        frame.type, frame.payload, frame.sequence, frame.timestamp, frame.flags
+                    )
+            if self.handoff is not None:
+                self.handoff += self.decoder.pending
+        else:
+            self.raw_received(data)
+        if self.handoff is not None:
+            self.hand_off()
+
+    def raw_received(self, data):
+        if self.client_id is None and self.server.mode != "echo":
+            # Client.send_client_id flushes the id before the audio threads start,
+            # so the first segment of a raw stream carries the client_id on its own
+            self.receive_client_id(data)
+            return
+        if self.remainder:
+            data = self.remainder + data
+            self.remainder = b""
+        if len(data) % SAMPLE_WIDTH:
+            self.remainder = bytes(data[-1:])
+            data = data[:-1]
+        if not data:
+            return
+        if self.room is not None:
+            self.room.pcm_received(self, data)
+        elif self.peer is not None:
+            if self.converter is not None:
+                data = self.converter.convert(data)
+            self.peer.send_raw(data)
+
+    def frame_received(self, frame):
+        if frame.type == voip_protocol.PING and self.client_id is None and self.id_timer is not None:
+            # Prewarmed clients ping until their call starts, which keeps the connection open
+            self.id_timer.cancel()
+            self.id_timer = asyncio.get_running_loop().call_later(
+                self.server.id_timeout, self.id_timed_out
+            )
+            return
+        super().frame_received(frame)
+
+    def receive_client_id(self, data):
+        self.id_timer.cancel()
+        super().receive_client_id(data)
+
+    def open_channel(self, channel):
+        # The connection's own call may have ended, so a channel is enough to keep it
+        if self.id_timer is not None:
+            self.id_timer.cancel()
+        return super().open_channel(channel)
+
+    def start_handoff(self):
+        # The owning worker replays the handoff bytes, so they start with the client_id
+        if self.framed:
+            self.handoff = self.hello_frame()
+        else:
+            self.handoff = bytearray(self.client_id.encode())
+
+    def hand_off(self):
+        handoff, self.handoff = self.handoff, None
+        self.server.cluster.hand_off(self, handoff)
+        # The call is the owner's now, so connection_lost must not leave it
+        self.client_id = None
+        self.transport.close()
+
+    def id_timed_out(self):
+        logger.warning(f"Rejected {self.address}: no client_id received")
+        self.close()
+
+    def send(self, data):
+        # data is one whole frame, or a sample aligned chunk for raw connections
+        if not self.paused and not self.queue:
+            self.transport.write(data)
+            return
+        self.queue.append(bytes(data))
+        self.queued_bytes += len(data)
+        if self.queued_bytes > self.server.max_queue_bytes:
+            self.drop_oldest()
+
+    def drop_oldest(self):
+        # Realtime audio is worthless once late, so the oldest audio goes first
+        while self.queued_bytes > self.server.max_queue_bytes and self.queue:
+            chunk = self.queue.popleft()
+            self.queued_bytes -= len(chunk)
+            self.dropped_bytes += len(chunk)
+            self.server.dropped_bytes += len(chunk)
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+        while self.queue and not self.paused:
+            chunk = self.queue.popleft()
+            self.queued_bytes -= len(chunk)
+            self.transport.write(chunk)
+
+    def close(self):
+        self.transport.close()
+
+    def connection_lost(self, exc):
+        if self.id_timer is not None:
+            self.id_timer.cancel()
+        self.server.connections.discard(self)
+        if self.client_id is not None:
+            self.server.leave(self)
+        self.close_channels()
+        self.queue.clear()
+        self.queued_bytes = 0
+        logger.info(f"Client disconnected: {self.address}")
+
+
+class DatagramEndpoint(Endpoint):
+    # One UDP caller. Every datagram carries exactly one frame and nothing is
+    # queued or retransmitted, so a lost datagram never delays the ones behind it
+    max_payload = voip_protocol.MAX_DATAGRAM_PAYLOAD
+
+    def __init__(self, relay, address):
+        super().__init__(relay.server)
+        self.relay = relay
+        self.address = address
+        self.framed = True
+        self.last_seen = 0
+
+    def mux_received(self, frame):
+        super().mux_received(frame)
+        if not len(frame.payload) and self.client_id is None and not self.channels:
+            self.close()  # Hung up, so the address is forgotten now rather than at udp_timeout
+
+    def send(self, data):
+        self.relay.transport.sendto(data, self.address)
+
+    def close(self):
+        self.relay.remove(self)
+
+
+class ChannelEndpoint(Endpoint):
+    # A call multiplexed on another endpoint's connection, see voip_protocol.MUX
+    def __init__(self, parent, channel):
+        super().__init__(parent.server)
+        self.parent = parent
+        self.channel = channel
+        self.address = f"{parent.address}#{channel}"
+        self.framed = True
+        self.max_payload = parent.max_payload - voip_protocol.HEADER_SIZE
+        self.owner = None  # The worker owning the call when it is proxied there, see Cluster
+
+    def mux_received(self, frame):
+        pass  # Channels do not nest
+
+    def start_handoff(self):
+        # The connection carries other calls, so instead of handing it over the
+        # channel's frames are proxied to the owner from here on
+        self.owner = self.server.cluster.owner(self.client_id)
+        self.server.cluster.send_channel(self, self.hello_frame())
+
+    def send(self, data):
+        self.parent.send(voip_protocol.encode_mux(self.channel, data))
+
+    def close(self):
+        # Rejected by the server, so the client is told the call ended
+        if self.parent.channels.get(self.channel) is self:
+            del self.parent.channels[self.channel]
+            self.parent.send(voip_protocol.encode_mux(self.channel, b""))
+
+
+class ProxyEndpoint(Endpoint):
+    # The owner's side of a channel proxied from another worker, see Cluster
+    max_payload = voip_protocol.MAX_DATAGRAM_PAYLOAD - voip_protocol.HEADER_SIZE
+
+    def __init__(self, cluster, key):
+        super().__init__(cluster.server)
+        self.cluster = cluster
+        self.key = key  # (worker, token, channel)
+        self.address = f"worker {key[0]} #{key[1]}:{key[2]}"
+        self.framed = True
+
+    def mux_received(self, frame):
+        pass
+
+    def send(self, data):
+        self.cluster.reply(self, data)
+
+    def close(self):
+        if self.cluster.proxies.get(self.key) is self:
+            del self.cluster.proxies[self.key]
+            self.cluster.reply(self, b"")
+
+
+def frame_pcm(frame):
+    # PCM of an audio or REDUNDANT frame, or None if it can not be decoded here
+    try:
+        if frame.type == voip_protocol.REDUNDANT:
+            frame = voip_protocol.split_redundant(frame)[0]  # Just the audio, without its FEC copies
+        if frame.type == voip_protocol.PCM16:
+            return frame.payload
+        if frame.type in voip_protocol.AUDIO_TYPES and voip_codec is not None:
+            return voip_codec.decode(frame.type, frame.payload)
+    except voip_protocol.ProtocolError:
+        pass
+    return None
+
+
+def stream_converter(endpoint, rate):
+    # Resamples endpoint's audio to rate, or None when no conversion is needed or possible
+    if endpoint.rate == rate:
+        return None
+    if voip_resample is None:
+        logger.warning(f"NumPy is required to resample {endpoint.address} to {rate} Hz")
+        return None
+    return voip_resample.FormatConverter(endpoint.rate, rate)
+
+
+def announced_client_id(frame):
+    # The client_id a HELLO carries, also one multiplexed on a channel, or None
+    if frame.type == voip_protocol.MUX and len(frame.payload):
+        try:
+            frame = voip_protocol.decode_frame(frame.payload)
+        except voip_protocol.ProtocolError:
+            return None
+    return frame.payload if frame.type == voip_protocol.HELLO else None
+
+
+class DatagramRelay(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.endpoints = {}  # address -> DatagramEndpoint
+        self.routes = {}  # address -> [worker, last_seen] for callers another worker owns
+        self.expiry_task = None
+        self.invalid_datagrams = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.expiry_task = asyncio.get_running_loop().create_task(self.expire())
+
+    def datagram_received(self, data, address):
+        if self.server.mode == "echo":
+            self.transport.sendto(data, address)
+            return
+        try:
+            frame = voip_protocol.decode_frame(data)
+        except voip_protocol.ProtocolError:
+            self.invalid_datagrams += 1
+            return
+        endpoint = self.endpoints.get(address)
+        if endpoint is None:
+            if self.route(data, frame, address):
+                return
+            if announced_client_id(frame) is None:
+                return
+            endpoint = DatagramEndpoint(self, address)
+            self.endpoints[address] = endpoint
+            logger.info(f"Client connected: {address} (udp)")
+        # Clients repeat HELLO while streaming, which also refreshes last_seen
+        endpoint.last_seen = asyncio.get_running_loop().time()
+        endpoint.frame_received(frame)
+
+    def route(self, data, frame, address):
+        # A UDP caller can not be handed over like a socket, so when another
+        # worker owns its call every datagram is forwarded there instead
+        cluster = self.server.cluster
+        if cluster is None:
+            return False
+        route = self.routes.get(address)
+        if route is None:
+            client_id = announced_client_id(frame)
+            if client_id is None:
+                return False
+            worker = cluster.owner_of(client_id)
+            if worker == cluster.index:
+                return False
+            route = self.routes[address] = [worker, 0]
+        route[1] = asyncio.get_running_loop().time()
+        cluster.forward(route[0], data, address)
+        return True
+
+    async def expire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.server.udp_timeout / 2)
+            idle_since = loop.time() - self.server.udp_timeout
+            for endpoint in list(self.endpoints.values()):
+                if endpoint.last_seen < idle_since:
+                    self.remove(endpoint)
+            for address, (_, last_seen) in list(self.routes.items()):
+                if last_seen < idle_since:
+                    del self.routes[address]
+
+    def remove(self, endpoint):
+        if self.endpoints.pop(endpoint.address, None) is None:
+            return
+        if endpoint.client_id is not None:
+            self.server.leave(endpoint)
+        endpoint.close_channels()
+        logger.info(f"Client disconnected: {endpoint.address} (udp)")
+
+    def close(self):
+        if self.expiry_task is not None:
+            self.expiry_task.cancel()
+        for endpoint in list(self.endpoints.values()):
+            self.remove(endpoint)
+        if self.transport is not None:
+            self.transport.close()
+
+
+class ConferenceRoom:
+    """Everyone who joined with one client_id in conference mode.
+
+    Incoming audio is decoded to PCM at SAMPLE_RATE and queued per
+    participant. Every TICK_MS the room takes one tick of audio from each
+    queue, silence for a participant with nothing queued, and sends each
+    participant the mix of everyone else (see voip_mixer.Mixer), resampled
+    to the participant's own rate. A late or quiet participant therefore
+    never delays the others.
+    """
+
+    def __init__(self, client_id, max_participants=64):
+        self.client_id = client_id
+        self.max_participants = max_participants
+        self.frame_bytes = SAMPLE_RATE * SAMPLE_WIDTH * TICK_MS // 1000
+        self.max_backlog = SAMPLE_RATE * SAMPLE_WIDTH * MAX_BACKLOG_MS // 1000
+        self.mixer = voip_mixer.Mixer(self.frame_bytes // SAMPLE_WIDTH, max_participants)
+        self.participants = []  # Row order of the mixer
+        self.pending = {}  # endpoint -> PCM not mixed yet
+        self.converters = {}  # endpoint -> (to SAMPLE_RATE, from it), for participants at other rates
+        self.task = None
+        self.ticks = 0
+        self.dropped_bytes = 0
+
+    def add(self, endpoint):
+        if len(self.participants) >= self.max_participants:
+            return False
+        self.participants.append(endpoint)
+        self.pending[endpoint] = bytearray()
+        if endpoint.rate != SAMPLE_RATE:
+            self.converters[endpoint] = (
+                voip_resample.FormatConverter(endpoint.rate, SAMPLE_RATE),
+                voip_resample.FormatConverter(SAMPLE_RATE, endpoint.rate),
+            )
+        endpoint.room = self
+        return True
+
+    def remove(self, endpoint):
+        if endpoint in self.pending:
+            self.participants.remove(endpoint)
+            del self.pending[endpoint]
+            self.converters.pop(endpoint, None)
+        endpoint.room = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def frame_received(self, endpoint, frame):
+        if frame.type in CONVERTED_TYPES:
+            pcm = frame_pcm(frame)
+            if pcm is None:
+                return
+            converters = self.converters.get(endpoint)
+            if converters is not None:
+                pcm = converters[0].convert(pcm)
+            self.pcm_received(endpoint, pcm)
+        elif frame.type == voip_protocol.PING:
+            # There is no single peer to answer, so the round trip is to the server
+            endpoint.send_frame(frame._replace(type=voip_protocol.PONG))
+
+    def pcm_received(self, endpoint, pcm):
+        pending = self.pending.get(endpoint)
+        if pending is None:
+            return
+        pending += pcm
+        excess = len(pending) - self.max_backlog
+        if excess > 0:
+            excess += excess % SAMPLE_WIDTH
+            del pending[:excess]
+            self.dropped_bytes += excess
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while self.participants:
+            next_tick += TICK_MS / 1000
+            delay = next_tick - loop.time()
+            if delay < -5 * TICK_MS / 1000:
+                next_tick = loop.time()  # Stalled, so restart the clock rather than burst
+            await asyncio.sleep(max(delay, 0))
+            self.tick()
+        self.task = None
+
+    def tick(self):
+        for row, endpoint in enumerate(self.participants):
+            pending = self.pending[endpoint]
+            if len(pending) >= self.frame_bytes:
+                self.mixer.load(row, pending)
+                del pending[:self.frame_bytes]
+            else:
+                self.mixer.silence(row)
+        outputs = self.mixer.mix(len(self.participants))
+        for row, endpoint in enumerate(self.participants):
+            pcm = outputs[row].tobytes()
+            converters = self.converters.get(endpoint)
+            if converters is not None:
+                pcm = converters[1].convert(pcm)
+            endpoint.send_raw(pcm)
+        self.ticks += 1
+
+
+class Cluster:
+    """Routes calls between relay workers that share one port.
+
+    Every worker listens on the port with SO_REUSEPORT, so the kernel spreads
+    callers across workers without knowing who they are calling. Each
+    client_id is owned by one worker, picked by its hash. A worker that
+    receives a client_id it does not own sends the TCP socket to the owner
+    over a Unix datagram socket (SCM_RIGHTS), along with the bytes it has
+    already read, and forgets the connection. A UDP caller has no socket of
+    its own, so its datagrams are forwarded to the owner, which answers from
+    its own socket on the shared port. Calls multiplexed on a connection
+    that carries other calls can not move either, so the worker holding the
+    connection proxies each channel's frames to its owner and relays the
+    answers back.
+    """
+
+    def __init__(self, index, workers, socket_dir):
+        self.index = index
+        self.workers = workers
+        self.socket_dir = socket_dir
+        self.server = None
+        self.socket = None
+        self.buffer = bytearray(MAX_MESSAGE)
+        self.parents = {}  # token -> endpoint whose channels are proxied to other workers
+        self.tokens = 0
+        self.proxies = {}  # (worker, token, channel) -> ProxyEndpoint
+        self.handoffs = 0
+        self.adopted = 0
+        self.forwarded_datagrams = 0
+        self.failed_handoffs = 0
+
+    def path(self, worker):
+        return os.path.join(self.socket_dir, f"worker-{worker}.sock")
+
+    def owner(self, client_id):
+        return zlib.crc32(client_id.encode()) % self.workers
+
+    def owner_of(self, data):
+        # Like Endpoint.receive_client_id. An invalid client_id is rejected locally
+        try:
+            return self.owner(bytes(data).decode().strip())
+        except ValueError:
+            return self.index
+
+    def start(self, server):
+        self.server = server
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.socket.bind(self.path(self.index))
+        asyncio.get_running_loop().add_reader(self.socket.fileno(), self.message_received)
+
+    def send(self, worker, message, fds=()):
+        ancdata = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))] if fds else []
+        try:
+            self.socket.sendmsg([message], ancdata, 0, self.path(worker))
+            return True
+        except OSError as e:  # Owner not running or backed up
+            logger.warning(f"Could not reach worker {worker}: {e}")
+            return False
+
+    def hand_off(self, connection, handoff):
+        worker = self.owner(connection.client_id)
+        sock = connection.transport.get_extra_info("socket")
+        if self.send(worker, HANDOFF + handoff, [sock.fileno()]):
+            self.handoffs += 1
+            logger.info(f"Handed {connection.address} to worker {worker}")
+        else:
+            self.failed_handoffs += 1  # The caller reconnects once this worker closes it
+
+    def forward(self, worker, data, address):
+        host = address[0].encode()
+        header = DATAGRAM + struct.pack("!HB", address[1], len(host)) + host
+        if self.send(worker, header + data):
+            self.forwarded_datagrams += 1
+
+    def send_channel(self, endpoint, data):
+        parent = endpoint.parent
+        if parent.token is None:
+            self.tokens += 1
+            parent.token = self.tokens
+            self.parents[parent.token] = parent
+        header = CHANNEL + CHANNEL_HEADER.pack(self.index, parent.token, endpoint.channel)
+        self.send(endpoint.owner, header + data)
+
+    def reply(self, proxy, data):
+        worker, token, channel = proxy.key
+        self.send(worker, REPLY + REPLY_HEADER.pack(token, channel) + data)
+
+    def channel_received(self, key, data):
+        proxy = self.proxies.get(key)
+        if not len(data):
+            if proxy is not None:
+                del self.proxies[key]
+                if proxy.client_id is not None:
+                    self.server.leave(proxy)
+            return
+        try:
+            frame = voip_protocol.decode_frame(data)
+        except voip_protocol.ProtocolError:
+            return
+        if proxy is None:
+            if frame.type != voip_protocol.HELLO:
+                return
+            proxy = self.proxies[key] = ProxyEndpoint(self, key)
+        proxy.frame_received(frame)
+
+    def reply_received(self, token, channel, data):
+        parent = self.parents.get(token)
+        endpoint = parent.channels.get(channel) if parent is not None else None
+        if endpoint is None or endpoint.owner is None:
+            return
+        if not len(data):
+            endpoint.close()
+        else:
+            parent.send(voip_protocol.encode_mux(channel, data))
+
+    def message_received(self):
+        while True:
+            try:
+                size, ancdata, _, _ = self.socket.recvmsg_into(
+                    [self.buffer], socket.CMSG_SPACE(FD_SIZE)
+                )
+            except BlockingIOError:
+                return
+            fds = array.array("i")
+            for level, kind, data in ancdata:
+                if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                    fds.frombytes(data[:len(data) - len(data) % FD_SIZE])
+            message = memoryview(self.buffer)[:size]
+            if message[:1] == HANDOFF and len(fds) == 1:
+                self.adopt(fds[0], bytes(message[1:]))
+            elif message[:1] == DATAGRAM and self.server.datagram_relay is not None:
+                port, length = struct.unpack_from("!HB", message, 1)
+                host = bytes(message[4:4 + length]).decode()
+                self.server.datagram_relay.datagram_received(message[4 + length:], (host, port))
+            elif message[:1] == CHANNEL:
+                key = CHANNEL_HEADER.unpack_from(message, 1)
+                self.channel_received(key, message[1 + CHANNEL_HEADER.size:])
+            elif message[:1] == REPLY:
+                token, channel = REPLY_HEADER.unpack_from(message, 1)
+                self.reply_received(token, channel, message[1 + REPLY_HEADER.size:])
+            else:
+                for fd in fds:
+                    os.close(fd)
+
+    def adopt(self, fd, preamble):
+        sock = socket.socket(fileno=fd)
+        self.adopted += 1
+        asyncio.get_running_loop().create_task(self.accept(sock, preamble))
+
+    async def accept(self, sock, preamble):
+        try:
+            await asyncio.get_running_loop().connect_accepted_socket(
+                lambda: Connection(self.server, preamble), sock
+            )
+        except OSError as e:
+            logger.warning(f"Could not adopt a handed off connection: {e}")
+            sock.close()
+
+    def close(self):
+        if self.socket is not None:
+            asyncio.get_running_loop().remove_reader(self.socket.fileno())
+            self.socket.close()
+            self.socket = None
+
+
+class RelayServer:
+    def __init__(
+        self,
+        host="0.0.0.0",
+        port=8080,
+        mode="relay",
+        max_queue_bytes=16000,  # 0.5 sec of 16 kHz PCM 16 bit audio
+        write_buffer_bytes=8192,
+        id_timeout=5,
+        transport="tcp",
+        udp_timeout=10,
+        max_participants=64,
+        cluster=None,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        if mode == "conference" and voip_mixer is None:
+            raise ValueError("conference mode requires NumPy")
+        if transport not in TRANSPORTS:
+            raise ValueError(f"transport must be one of {TRANSPORTS}")
+        self.host = host
+        self.port = port
+        self.mode = mode
+        self.max_queue_bytes = max_queue_bytes
+        self.write_buffer_bytes = write_buffer_bytes
+        self.id_timeout = id_timeout
+        self.transport = transport
+        self.udp_timeout = udp_timeout
+        self.max_participants = max_participants
+        self.cluster = cluster
+        self.connections = set()
+        self.calls = {}  # client_id -> endpoints sharing that id
+        self.rooms = {}  # client_id -> ConferenceRoom
+        self.dropped_bytes = 0
+        self.server = None
+        self.datagram_relay = None
+
+    def join(self, endpoint):
+        if self.cluster is not None and self.cluster.owner(endpoint.client_id) != self.cluster.index:
+            # Connections are handed over and channels proxied. DatagramRelay routes the rest
+            endpoint.start_handoff()
+            return
+        if self.mode == "conference":
+            self.join_room(endpoint)
+            return
+        call = self.calls.setdefault(endpoint.client_id, [])
+        if len(call) >= 2:
+            logger.warning(f"Rejected {endpoint.address}: call {endpoint.client_id} is full")
+            endpoint.client_id = None
+            endpoint.close()
+            return
+        call.append(endpoint)
+        if len(call) == 2:
+            call[0].peer, call[1].peer = call[1], call[0]
+            call[0].converter = stream_converter(call[0], call[1].rate)
+            call[1].converter = stream_converter(call[1], call[0].rate)
+            call[0].send_hello(call[1].codecs)
+            call[1].send_hello(call[0].codecs)
+            logger.info(f"Call {endpoint.client_id} connected")
+        else:
+            logger.info(f"Call {endpoint.client_id} waiting for peer")
+
+    def join_room(self, endpoint):
+        room = self.rooms.get(endpoint.client_id)
+        if room is None:
+            room = self.rooms[endpoint.client_id] = ConferenceRoom(
+                endpoint.client_id, self.max_participants
+            )
+        if not room.add(endpoint):
+            logger.warning(f"Rejected {endpoint.address}: room {endpoint.client_id} is full")
+            endpoint.client_id = None
+            endpoint.close()
+            return
+        # The room decodes every codec, so clients may send compressed audio
+        endpoint.send_hello(voip_codec.SUPPORTED)
+        room.start()
+        logger.info(f"Room {endpoint.client_id} has {len(room.participants)} participant(s)")
+
+    def leave(self, endpoint):
+        if endpoint.room is not None:
+            room = endpoint.room
+            room.remove(endpoint)
+            if not room.participants:
+                self.rooms.pop(room.client_id, None)
+            return
+        call = self.calls.get(endpoint.client_id, [])
+        if endpoint in call:
+            call.remove(endpoint)
+        # The remaining peer waits for the caller to reconnect
+        for peer in call:
+            peer.peer = None
+            peer.converter = None
+        if not call:
+            self.calls.pop(endpoint.client_id, None)
+        endpoint.peer = None
+        endpoint.converter = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        reuse_port = self.cluster is not None
+        if self.transport in ("tcp", "both"):
+            self.server = await loop.create_server(
+                lambda: Connection(self), self.host, self.port, reuse_port=reuse_port
+            )
+            self.port = self.server.sockets[0].getsockname()[1]
+        if self.transport in ("udp", "both"):
+            self.datagram_relay = DatagramRelay(self)
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: self.datagram_relay, local_addr=(self.host, self.port),
+                reuse_port=reuse_port,
+            )
+            self.port = transport.get_extra_info("sockname")[1]
+        if self.cluster is not None:
+            self.cluster.start(self)
+        logger.info(f"VOIP server running on {self.port} ({self.mode} mode, {self.transport})")
+
+    async def serve_forever(self):
+        if self.server is None and self.datagram_relay is None:
+            await self.start()
+        try:
+            if self.server is not None:
+                await self.server.serve_forever()
+            else:
+                await asyncio.Event().wait()
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for connection in list(self.connections):
+            connection.close()
+        if self.datagram_relay is not None:
+            self.datagram_relay.close()
+        if self.cluster is not None:
+            self.cluster.close()
+
+
+def configure_logging(debug):
+    logging.basicConfig(
+        level=logging.INFO if debug else logging.WARNING,
+        format="%(asctime)s %(name)s: %(message)s",
+    )
+
+
+def run_worker(index, workers, socket_dir, options, debug):
+    configure_logging(debug)
+    server = RelayServer(cluster=Cluster(index, workers, socket_dir), **options)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+class Workers:
+    """Runs a RelayServer in each of several processes on one port, see Cluster."""
+
+    def __init__(self, workers, debug=False, **options):
+        if not hasattr(socket, "SO_REUSEPORT") or not hasattr(socket, "SCM_RIGHTS"):
+            raise ValueError("workers need SO_REUSEPORT and Unix sockets")
+        self.workers = workers
+        self.debug = debug
+        self.options = options
+        self.port = options.get("port", 8080)
+        self.socket_dir = None
+        self.processes = []
+
+    def start(self, timeout=10):
+        if not self.port:
+            # Every worker has to bind the same port, so pick a free one up front
+            with socket.socket() as sock:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+                sock.bind((self.options.get("host", "0.0.0.0"), 0))
+                self.port = sock.getsockname()[1]
+        options = dict(self.options, port=self.port)
+        self.socket_dir = tempfile.mkdtemp(prefix="voip-workers-")
+        context = multiprocessing.get_context("spawn")
+        for index in range(self.workers):
+            process = context.Process(
+                target=run_worker,
+                args=(index, self.workers, self.socket_dir, options, self.debug),
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+        # Each worker binds its Unix socket once it is listening
+        deadline = time.monotonic() + timeout
+        while len(os.listdir(self.socket_dir)) < self.workers:
+            if time.monotonic() > deadline or not all(p.is_alive() for p in self.processes):
+                self.stop()
+                raise RuntimeError("relay workers did not start")
+            time.sleep(0.05)
+
+    @property
+    def pids(self):
+        return [process.pid for process in self.processes]
+
+    def wait(self):
+        for process in self.processes:
+            process.join()
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        if self.socket_dir is not None:
+            shutil.rmtree(self.socket_dir, ignore_errors=True)
+            self.socket_dir = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kivy VoIP relay server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--mode", choices=MODES, default="relay")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="tcp")
+    parser.add_argument("--max-queue-bytes", type=int, default=16000)
+    parser.add_argument("--max-participants", type=int, default=64, help="per conference room")
+    parser.add_argument("--workers", type=int, default=1, help="processes sharing the port")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args(argv)
+    configure_logging(args.debug)
+    options = {
+        "host": args.host,
+        "port": args.port,
+        "mode": args.mode,
+        "max_queue_bytes": args.max_queue_bytes,
+        "transport": args.transport,
+        "max_participants": args.max_participants,
+    }
+    if args.workers > 1:
+        workers = Workers(args.workers, args.debug, **options)
+        workers.start()
+        try:
+            workers.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            workers.stop()
+        return
+    server = RelayServer(**options)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
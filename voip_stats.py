@@ -0,0 +1,177 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import bisect
+import threading
+import time
+
+# Upper bucket edges in microseconds, doubling from 16 us to about 1 s
+LATENCY_BUCKETS_US = [2 ** i for i in range(4, 21)]
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_US) + 1)
+        self.count = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+
+    def record(self, seconds):
+        us = seconds * 1000000
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_US, us)] += 1
+        self.count += 1
+        self.total_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total_us += other.total_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, fraction):
+        # Upper edge of the bucket holding the percentile, or the max for the last bucket
+        if self.count == 0:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if index < len(LATENCY_BUCKETS_US):
+                    return min(LATENCY_BUCKETS_US[index], self.max_us)
+                return self.max_us
+        return self.max_us
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total_us / self.count if self.count else None,
+            "p50_us": self.percentile(0.5),
+            "p99_us": self.percentile(0.99),
+            "max_us": self.max_us,
+        }
+
+
+class CallStats:
+    """Counters for one call.
+
+    The audio threads update plain attributes, which costs a few hundred
+    nanoseconds per frame and needs no lock. snapshot() copies them into a
+    dict that any thread can read, such as the UI thread.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.frames_received = 0
+        self.bytes_received = 0
+        self.mic_invalid_operation = 0  # AudioRecord.ERROR_INVALID_OPERATION
+        self.mic_bad_value = 0  # AudioRecord.ERROR_BAD_VALUE
+        self.speaker_underruns = 0
+        self.silent_frames = 0  # Not sent because of VAD
+        self.bytes_saved = 0  # Not sent because of VAD
+        self.concealed_frames = 0  # Lost frames filled in by packet loss concealment
+        self.recovered_frames = 0  # Lost frames rebuilt from FEC copies
+        self.fec_bytes = 0  # Sent in FEC copies
+        self.connect_ms = None
+        self.tls_handshake_ms = None
+        self.tls_resumed = None  # True when the TLS session was resumed from an earlier connection
+        self.warm_connection = False  # Started on the connection opened by Client.prewarm
+        self.reconnects = 0  # Successful reconnects after the connection dropped mid-call
+        self.reconnect_attempts = 0
+        self.rtt_ms = None  # Latest end-to-end round trip, when the peer answers pings
+        self.min_rtt_ms = None
+        self.write_latency = LatencyHistogram()
+        self.read_latency = LatencyHistogram()
+        # Capture to playout, only meaningful when both callers share a clock (one host)
+        self.mouth_to_ear = LatencyHistogram()
+        self.jitter = None  # The call's JitterBuffer, if any
+        self.capture = None  # The call's AudioRing, if any
+
+    def sent(self, size, seconds, frames=1):
+        self.frames_sent += frames
+        self.bytes_sent += size
+        self.write_latency.record(seconds)
+
+    def received(self, size, seconds=None):
+        # seconds is None for frames that arrived in a read already counted
+        self.bytes_received += size
+        if seconds is not None:
+            self.read_latency.record(seconds)
+
+    def round_trip(self, rtt_ms):
+        self.rtt_ms = rtt_ms
+        if self.min_rtt_ms is None or rtt_ms < self.min_rtt_ms:
+            self.min_rtt_ms = rtt_ms
+
+    def snapshot(self):
+        return {
+            "duration_s": time.monotonic() - self.started,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "frames_received": self.frames_received,
+            "bytes_received": self.bytes_received,
+            "mic_invalid_operation": self.mic_invalid_operation,
+            "mic_bad_value": self.mic_bad_value,
+            "speaker_underruns": self.speaker_underruns,
+            "silent_frames": self.silent_frames,
+            "bytes_saved": self.bytes_saved,
+            "concealed_frames": self.concealed_frames,
+            "recovered_frames": self.recovered_frames,
+            "fec_bytes": self.fec_bytes,
+            "connect_ms": self.connect_ms,
+            "tls_handshake_ms": self.tls_handshake_ms,
+            "tls_resumed": self.tls_resumed,
+            "warm_connection": self.warm_connection,
+            "reconnects": self.reconnects,
+            "reconnect_attempts": self.reconnect_attempts,
+            "rtt_ms": self.rtt_ms,
+            "min_rtt_ms": self.min_rtt_ms,
+            "write_latency": self.write_latency.snapshot(),
+            "read_latency": self.read_latency.snapshot(),
+            "mouth_to_ear": self.mouth_to_ear.snapshot(),
+            "jitter": self.jitter.stats() if self.jitter is not None else None,
+            "capture": self.capture.stats() if self.capture is not None else None,
+        }
+
+
+class StatsReporter(threading.Thread):
+    # Pushes a snapshot to callback every interval secs until stopped
+    def __init__(self, stats, callback, interval=1.0):
+        super().__init__(daemon=True)
+        self.stats = stats
+        self.callback = callback
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.callback(self.stats.snapshot())
+
+    def stop(self):
+        self.stopped.set()
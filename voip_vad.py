@@ -0,0 +1,103 @@
+"""
+MIT License
+
+Copyright (c) 2025 Sanquez Heard
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import math
+
+import numpy as np
+
+PCM = np.dtype("<i2")
+FULL_SCALE = 32768.0
+# Where the noise floor starts. Starting from the first frame would take a
+# caller who speaks, or a tone that plays, from the first frame for noise
+INITIAL_NOISE_DB = -60.0
+
+
+class VoiceActivityDetector:
+    """Classifies microphone frames as speech or silence.
+
+    A frame is speech when its energy is well above the tracked noise floor,
+    or moderately above it with a high zero-crossing rate (unvoiced sounds
+    like "s" and "f"). Speech keeps the detector open for hangover_ms so word
+    endings are not clipped.
+    """
+
+    def __init__(self, sample_rate=16000, margin_db=9.0, zcr_threshold=0.25, hangover_ms=300):
+        self.sample_rate = sample_rate
+        self.margin_db = margin_db
+        self.zcr_threshold = zcr_threshold
+        self.hangover_ms = hangover_ms
+        self.noise_db = INITIAL_NOISE_DB  # Noise floor in dBov, also sent as the comfort noise level
+        self.level_db = -90.0
+        self.zcr = 0.0
+        self.remaining_ms = 0.0
+
+    def is_speech(self, pcm):
+        samples = np.frombuffer(pcm, PCM).astype(np.float32)
+        if len(samples) < 2:
+            return self.remaining_ms > 0
+        energy = float(np.dot(samples, samples)) / (len(samples) * FULL_SCALE * FULL_SCALE)
+        self.level_db = 10 * math.log10(energy + 1e-9)
+        self.zcr = np.count_nonzero(np.signbit(samples[1:]) != np.signbit(samples[:-1])) / len(samples)
+        above_floor = self.level_db - self.noise_db
+        speech = above_floor > self.margin_db or (
+            above_floor > self.margin_db / 2 and self.zcr > self.zcr_threshold
+        )
+        # The floor drops at once to quieter frames and creeps up, slower during speech
+        if self.level_db < self.noise_db:
+            self.noise_db = self.level_db
+        else:
+            self.noise_db += (self.level_db - self.noise_db) * (0.002 if speech else 0.05)
+        if speech:
+            self.remaining_ms = self.hangover_ms
+        else:
+            self.remaining_ms -= len(samples) * 1000 / self.sample_rate
+        return speech or self.remaining_ms > 0
+
+
+def comfort_noise_payload(level_db):
+    # One byte holding the noise level in -dBov, as in RFC 3389
+    return bytes((min(max(int(round(-level_db)), 0), 127),))
+
+
+class ComfortNoise:
+    # Regenerates background noise on the receiver from comfort noise markers
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.level_db = None
+
+    @property
+    def active(self):
+        return self.level_db is not None
+
+    def update(self, payload):
+        if len(payload):
+            self.level_db = -float(payload[0])
+
+    def stop(self):
+        self.level_db = None
+
+    def generate(self, size):
+        amplitude = FULL_SCALE * 10 ** (self.level_db / 20)
+        noise = self.rng.standard_normal(size // 2, dtype=np.float32) * amplitude
+        return np.clip(noise, -32768, 32767).astype(PCM).tobytes()